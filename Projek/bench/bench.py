@@ -0,0 +1,276 @@
+"""
+Benchmarks for the load, index, selection and history paths.
+
+  python bench/bench.py                       # 1k/10k/100k questions, 1k/10k/100k sessions
+  python bench/bench.py --full                # adds 500k questions and 1M sessions
+  python bench/bench.py --out before.json
+  python bench/bench.py --compare before.json # run again and print the change per case
+
+Everything runs on synthetic data generated from --seed in a temporary
+directory; the real data/ folder is never touched. Each case is run once
+to warm up, --repeat times for timing, and once more under tracemalloc
+for the peak allocation. Output is JSON: one entry per case with the
+item count, latency percentiles (ms), throughput (items/s) and peak
+memory (bytes).
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import datetime
+import subprocess
+import tracemalloc
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(SRC))
+
+import utils
+from utils import (
+    QuestionBank, SeenIndex, load_all_items, load_questions_for_package,
+    normalize_correct_answer, pick_questions_with_fresh_priority, pick_daily_challenge_by_level
+)
+from history_store import HistoryStore
+
+PACKAGES = ("pk", "pm", "pu", "ppu", "pbm", "lbi", "lbe")
+TOPICS = ("matematika", "bahasa indonesia", "penalaran umum", "konjungsi", "pemilihan kata")
+LEVELS = ("easy", "medium", "hard")
+BANK_SIZES = (1000, 10000, 100000)
+HISTORY_SIZES = (1000, 10000, 100000)
+FULL_BANK_SIZES = BANK_SIZES + (500000,)
+FULL_HISTORY_SIZES = HISTORY_SIZES + (1000000,)
+
+# ================= DATA =================
+def make_bank(n, seed):
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        pkg = PACKAGES[i % len(PACKAGES)]
+        choices = [f"pilihan {c} soal {i}" for c in "ABCDE"]
+        ans = rng.randrange(5)
+        # the same mix of answer spellings the real bank has
+        ca = (ans, "ABCDE"[ans], choices[ans], choices[ans].upper())[i % 4]
+        items.append({
+            "id": f"{pkg}-{i:06d}",
+            "package": pkg.upper() if i % 5 == 0 else pkg,
+            "topic": rng.choice(TOPICS),
+            "level": LEVELS[rng.randrange(3)],
+            "question": f"Soal nomor {i}: tentukan nilai x jika {rng.randrange(100)}x = {rng.randrange(1000)}.",
+            "choices": choices,
+            "correct_answer": ca,
+            "explanation": "Pembahasan singkat " * 4,
+        })
+    return items
+
+def make_history(n, bank, seed, per_session=8):
+    rng = random.Random(seed)
+    by_pkg = {}
+    for it in bank:
+        by_pkg.setdefault(it["package"].lower(), []).append(it["id"])
+    pkgs = sorted(by_pkg)
+    start = datetime.datetime(2025, 1, 1)
+    for i in range(n):
+        pkg = pkgs[i % len(pkgs)]
+        ids = rng.sample(by_pkg[pkg], k=min(per_session, len(by_pkg[pkg])))
+        yield {
+            "id": f"s{i:07d}",
+            "date": (start + datetime.timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M"),
+            "package": pkg,
+            "score": rng.randrange(per_session + 1),
+            "level": LEVELS[i % 3],
+            "daily": i % 7 == 0,
+            "all_ids": ids,
+        }
+
+# ================= TIMING =================
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+def measure(name, fn, items, repeat, setup=None, **params):
+    """Time fn(arg) where arg = setup() (untimed) or None. Returns one result dict."""
+    def run():
+        arg = setup() if setup else None
+        t = time.perf_counter()
+        fn(arg)
+        return time.perf_counter() - t
+
+    run()
+    times = sorted(run() for _ in range(repeat))
+
+    arg = setup() if setup else None
+    tracemalloc.start()
+    try:
+        fn(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    mean = sum(times) / len(times)
+    result = {
+        "case": name,
+        "params": params,
+        "items": items,
+        "repeat": repeat,
+        "ms": {
+            "min": times[0] * 1000,
+            "p50": _percentile(times, 0.5) * 1000,
+            "p90": _percentile(times, 0.9) * 1000,
+            "p99": _percentile(times, 0.99) * 1000,
+            "max": times[-1] * 1000,
+            "mean": mean * 1000,
+        },
+        "items_per_s": items / mean if mean > 0 else None,
+        "peak_bytes": peak,
+    }
+    print(f"  {name:<34} {json.dumps(params):<28} p50 {result['ms']['p50']:10.3f} ms"
+          f"  peak {peak / 1e6:8.2f} MB", file=sys.stderr)
+    return result
+
+# ================= CASES =================
+def bench_bank(n, workdir, seed, repeat):
+    out = []
+    bank_items = make_bank(n, seed)
+    path = os.path.join(workdir, f"soal_{n}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(bank_items, f, ensure_ascii=False)
+
+    saved = utils._BANK
+    utils._BANK = QuestionBank(path)
+    try:
+        out.append(measure("load_all_items.cold", lambda _: load_all_items(), n, repeat,
+                           setup=utils._BANK.invalidate, bank=n))
+        load_all_items()
+        out.append(measure("load_all_items.cached", lambda _: load_all_items(), n, max(repeat, 20), bank=n))
+        pool = load_questions_for_package("pk")
+        out.append(measure("load_questions_for_package.exact", lambda _: load_questions_for_package("pk"),
+                           len(pool), max(repeat, 20), bank=n))
+        fuzzy = load_questions_for_package("p")
+        out.append(measure("load_questions_for_package.fuzzy", lambda _: load_questions_for_package("p"),
+                           len(fuzzy), max(repeat, 20), bank=n))
+
+        raw = [it for it in bank_items if it["package"].lower() == "pk"]
+        out.append(measure("normalize_correct_answer", normalize_correct_answer, len(raw), repeat,
+                           setup=lambda: [dict(it) for it in raw], bank=n))
+
+        history = list(make_history(min(n, 10000), bank_items, seed))
+        seen = SeenIndex.from_history(history)
+        out.append(measure("pick_questions_with_fresh_priority",
+                           lambda _: pick_questions_with_fresh_priority(pool, 8, seen, "pk", "medium"),
+                           len(pool), max(repeat, 20), bank=n, sessions=len(history)))
+        out.append(measure("pick_questions_with_fresh_priority.records",
+                           lambda _: pick_questions_with_fresh_priority(pool, 8, history, "pk", "medium"),
+                           len(pool), repeat, bank=n, sessions=len(history)))
+        out.append(measure("pick_daily_challenge_by_level",
+                           lambda _: pick_daily_challenge_by_level(pool, "pk", "hard", 2, "2025-01-01"),
+                           len(pool), max(repeat, 20), bank=n))
+    finally:
+        utils._BANK = saved
+    return out
+
+def bench_history(n, workdir, seed, repeat):
+    out = []
+    bank_items = make_bank(2000, seed)
+    records = list(make_history(n, bank_items, seed))
+    path = os.path.join(workdir, f"history_{n}.jsonl")
+
+    def fresh_store():
+        if os.path.exists(path):
+            os.remove(path)
+        return HistoryStore(path, legacy_path=None).open()
+
+    out.append(measure("history.append_many", lambda store: store.append_many(records), n, repeat,
+                       setup=fresh_store, sessions=n))
+    singles = records[:200]
+    out.append(measure("history.append", lambda store: [store.append(r) for r in singles],
+                       len(singles), repeat, setup=fresh_store, sessions=n, appended=len(singles)))
+
+    fresh_store().append_many(records)
+    out.append(measure("history.load", lambda _: HistoryStore(path, legacy_path=None).open().load(),
+                       n, repeat, sessions=n))
+    store = HistoryStore(path, legacy_path=None).open()
+    store.count()
+    out.append(measure("history.page", lambda _: store.page(n // 2, 25), 25, max(repeat, 20), sessions=n))
+    out.append(measure("SeenIndex.from_history", lambda _: SeenIndex.from_history(records), n, repeat,
+                       sessions=n))
+    return out
+
+# ================= REPORT =================
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(SRC),
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def compare(old, new):
+    """Print p50 ratio new/old for every case present in both runs."""
+    def key(r):
+        return (r["case"], json.dumps(r["params"], sort_keys=True))
+    before = {key(r): r for r in old.get("results", [])}
+    print(f"{'case':<40} {'params':<28} {'old p50':>10} {'new p50':>10} {'ratio':>7}")
+    for r in new["results"]:
+        o = before.get(key(r))
+        if o is None:
+            continue
+        a, b = o["ms"]["p50"], r["ms"]["p50"]
+        ratio = b / a if a else float("inf")
+        print(f"{r['case']:<40} {json.dumps(r['params']):<28} {a:10.3f} {b:10.3f} {ratio:7.2f}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark load, selection and history paths")
+    ap.add_argument("--banks", type=int, nargs="*", help="question bank sizes")
+    ap.add_argument("--histories", type=int, nargs="*", help="history sizes (sessions)")
+    ap.add_argument("--full", action="store_true", help="include 500k questions and 1M sessions")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help="write the JSON report here instead of stdout")
+    ap.add_argument("--compare", help="earlier JSON report to compare against")
+    args = ap.parse_args(argv)
+
+    banks = args.banks if args.banks is not None else (FULL_BANK_SIZES if args.full else BANK_SIZES)
+    histories = args.histories if args.histories is not None else (FULL_HISTORY_SIZES if args.full else HISTORY_SIZES)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": [],
+    }
+    workdir = tempfile.mkdtemp(prefix="bloom-bench-")
+    try:
+        for n in banks:
+            print(f"bank {n}", file=sys.stderr)
+            report["results"].extend(bench_bank(n, workdir, args.seed, args.repeat))
+        for n in histories:
+            print(f"history {n}", file=sys.stderr)
+            report["results"].extend(bench_history(n, workdir, args.seed, args.repeat))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    elif not args.compare:
+        print(text)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+import math
+
+from utils import load_index, _norm_pkg_name
+
+# Elo-style scale: a student rated like a question answers it right half the time
+LEVEL_RATING = {"easy": 1350.0, "medium": 1500.0, "hard": 1650.0}
+DEFAULT_RATING = 1500.0
+BUCKET_WIDTH = 50.0
+
+def expected(ability, difficulty):
+    """Probability that a student with `ability` answers a question of `difficulty` correctly."""
+    return 1.0 / (1.0 + 10 ** ((difficulty - ability) / 400.0))
+
+def _k(attempts):
+    # big steps while little is known, smaller ones as evidence accumulates
+    return max(8.0, 40.0 / (1.0 + attempts / 10.0))
+
+class QuestionStat:
+    __slots__ = ('attempts', 'correct', 'seconds', 'timed', 'rating')
+
+    def __init__(self, rating):
+        self.attempts = 0
+        self.correct = 0
+        self.seconds = 0.0
+        self.timed = 0
+        self.rating = rating
+
+    def summary(self):
+        return {
+            'attempts': self.attempts,
+            'accuracy': self.correct / self.attempts if self.attempts else None,
+            'mean_seconds': self.seconds / self.timed if self.timed else None,
+            'rating': self.rating,
+        }
+
+class Analytics:
+    """
+    Incremental per-question, per-topic and per-student statistics.
+    - questions: accuracy, mean response time and an Elo difficulty rating
+    - topics: accuracy and mean time per (package, topic)
+    - students: an Elo ability rating per user
+    Questions are also kept in rating buckets per (package, level) so
+    nearest() can walk outward from a target rating without touching the
+    rest of the bank.
+    """
+
+    def __init__(self):
+        self.questions = {}
+        self.topics = {}
+        self.abilities = {}
+        self._index = None
+        self._buckets = {}
+        self._where = {}
+
+    # ----------------- bank -----------------
+    def _sync(self):
+        index = load_index()
+        if index is self._index:
+            return index
+        self._index = index
+        self._buckets = {}
+        self._where = {}
+        for name, pidx in index.packages.items():
+            for lvl, group in pidx.by_level.items():
+                for q in group:
+                    self._place(q, (name, lvl))
+        return index
+
+    def _prior(self, q):
+        return LEVEL_RATING.get(_norm_pkg_name(q.get('level')), DEFAULT_RATING)
+
+    def _stat(self, q):
+        qid = q.get('id')
+        st = self.questions.get(qid)
+        if st is None:
+            st = self.questions[qid] = QuestionStat(self._prior(q))
+        return st
+
+    def rating(self, q):
+        st = self.questions.get(q.get('id'))
+        return st.rating if st is not None else self._prior(q)
+
+    def _place(self, q, key):
+        b = int(self.rating(q) // BUCKET_WIDTH)
+        self._buckets.setdefault(key, {}).setdefault(b, set()).add(q)
+        self._where[id(q)] = (key, b)
+
+    def _move(self, q):
+        where = self._where.get(id(q))
+        if where is None:
+            return
+        key, old = where
+        new = int(self.rating(q) // BUCKET_WIDTH)
+        if new != old:
+            self._buckets[key][old].discard(q)
+            self._buckets[key].setdefault(new, set()).add(q)
+            self._where[id(q)] = (key, new)
+
+    # ----------------- updates -----------------
+    def ability(self, user=None):
+        return self.abilities.get(user, (DEFAULT_RATING, 0))[0]
+
+    def add_record(self, rec):
+        outcomes = rec.get('outcomes') or []
+        if not outcomes:
+            return
+        index = self._sync()
+        user = rec.get('user')
+        theta, n = self.abilities.get(user, (DEFAULT_RATING, 0))
+        for out in outcomes:
+            q = index.by_id.get(out.get('id'))
+            if q is None:
+                continue
+            y = 1.0 if out.get('correct') else 0.0
+            st = self._stat(q)
+            p = expected(theta, st.rating)
+            theta += _k(n) * (y - p)
+            st.rating -= _k(st.attempts) * (y - p)
+            n += 1
+
+            st.attempts += 1
+            st.correct += int(y)
+            secs = out.get('seconds')
+            if isinstance(secs, (int, float)):
+                st.seconds += secs
+                st.timed += 1
+            self._move(q)
+
+            tkey = (_norm_pkg_name(q.get('package')), _norm_pkg_name(q.get('topic')))
+            ts = self.topics.setdefault(tkey, [0, 0, 0.0, 0])
+            ts[0] += 1
+            ts[1] += int(y)
+            if isinstance(secs, (int, float)):
+                ts[2] += secs
+                ts[3] += 1
+        self.abilities[user] = (theta, n)
+
+    def clear(self):
+        self.questions = {}
+        self.topics = {}
+        self.abilities = {}
+        self._index = None
+
+    # ----------------- queries -----------------
+    def question_stats(self, qid):
+        st = self.questions.get(qid)
+        return st.summary() if st else None
+
+    def topic_stats(self, package=None):
+        target = _norm_pkg_name(package) if package else None
+        out = []
+        for (pkg, topic), (n, correct, secs, timed) in sorted(self.topics.items()):
+            if target is None or pkg == target:
+                out.append({'package': pkg, 'topic': topic, 'attempts': n,
+                            'accuracy': correct / n if n else None,
+                            'mean_seconds': secs / timed if timed else None})
+        return out
+
+    def nearest(self, package, level, target):
+        """Questions of package/level ordered by distance of their rating from `target`."""
+        index = self._sync()
+        level = (level or 'all').strip().lower()
+        names = [p.name for p in index.match(package)]
+        if names == [None]:
+            names = list(index.packages)
+        keys = []
+        for name in names:
+            levels = index.packages[name].by_level
+            for lvl in (levels if level == 'all' else (level, '')):
+                if (name, lvl) in self._buckets:
+                    keys.append((name, lvl))
+        if not keys:
+            return
+        bmin = min(min(self._buckets[k]) for k in keys)
+        bmax = max(max(self._buckets[k]) for k in keys)
+        center = int(target // BUCKET_WIDTH)
+        for step in range(0, max(center - bmin, bmax - center) + 1):
+            for b in ((center,) if step == 0 else (center - step, center + step)):
+                group = []
+                for k in keys:
+                    group.extend(self._buckets[k].get(b, ()))
+                group.sort(key=lambda q: abs(self.rating(q) - target))
+                yield from group
+
+def target_rating(ability, success=0.7):
+    """Question rating a student of `ability` answers right with probability `success`."""
+    return ability - 400.0 * math.log10(success / (1.0 - success))
@@ -0,0 +1,284 @@
+"""
+Compact indexed question bank (soal.bin).
+
+Build:  python bankfile.py [soal.json] [soal.bin]
+
+Layout (little-endian):
+  header      magic "BLMQ", version, flags, count, section offsets,
+              and the (mtime_ns, size) of the soal.json it was built from
+  strings     interned metadata strings: u32 count, then u16 length + utf-8
+  columns     id, package, level, topic as u32 string refs (count each),
+              correct answer as i16 (-1 = unresolved), flags as u8
+  offsets     u64 * (count + 1) into the text section
+  text        per question: JSON {"question", "choices", "explanation", "reading"}
+  report      JSON validation report from compile_items
+
+Loading reads the header, string table and columns only; the text section
+is mmap'ed and each question's text is decoded the first time it is read.
+"""
+import os
+import sys
+import json
+import mmap
+import struct
+from array import array
+
+from utils import Question, compile_items, load_json, file_stamp, SOAL_FILE, SOAL_BIN
+
+MAGIC = b"BLMQ"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIQQQQQQqq")
+NONE_REF = 0xFFFFFFFF
+FLAG_PLAYABLE = 1
+TEXT_FIELDS = ('question', 'choices', 'explanation', 'reading')
+
+class StaleBankError(ValueError):
+    """The compiled bank was built from a different soal.json."""
+
+class ClosedBankError(ValueError):
+    """The compiled bank was closed because the bank has been reloaded."""
+
+# ================= READ =================
+class LazyQuestion(Question):
+    """Question whose long text fields are read from the mmap on first access."""
+
+    __slots__ = ('_bank', '_pos', '_text', '_flags')
+
+    def __init__(self, bank, pos, qid, package, topic, level, answer, flags):
+        self._bank = bank
+        self._pos = pos
+        self._text = None
+        self._flags = flags
+        self.id = qid
+        self.package = package
+        self.topic = topic
+        self.level = level
+        self.correct_answer = answer
+
+    def _read_text(self):
+        try:
+            return self._bank.text(self._pos)
+        except ClosedBankError:
+            # handed out before a reload (e.g. a running session): use the current record
+            from utils import load_index
+            q = load_index().by_id.get(self.id)
+            return q.text_fields() if q is not None and q is not self else {}
+
+    def _load_text(self):
+        if self._text is None:
+            self._text = self._read_text()
+        return self._text
+
+    @property
+    def playable(self):
+        return bool(self._flags & FLAG_PLAYABLE) and self.correct_answer is not None
+
+    def text_fields(self):
+        # read without caching, so indexing the whole bank keeps memory flat
+        return self._text if self._text is not None else self._read_text()
+
+    @property
+    def question(self):
+        return self._load_text().get('question')
+
+    @property
+    def choices(self):
+        return tuple(self._load_text().get('choices') or ())
+
+    @property
+    def explanation(self):
+        return self._load_text().get('explanation')
+
+    @property
+    def reading(self):
+        return self._load_text().get('reading')
+
+class CompiledBank:
+    """
+    An open soal.bin: metadata in memory, text behind an mmap. close() it
+    when its questions are replaced; Windows cannot replace a mapped file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header()
+        except BaseException:
+            self.close()
+            raise
+
+    def _read_header(self):
+        mm = self._mm
+        if len(mm) < HEADER.size:
+            raise ValueError("compiled bank is truncated")
+        (magic, version, _flags, self.count, strings_off, columns_off, offsets_off,
+         text_off, report_off, end_off, src_mtime, src_size) = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a compiled question bank")
+        if end_off != len(mm):
+            raise ValueError("compiled bank is truncated")
+        self.source = (src_mtime, src_size) if src_size >= 0 else None
+        self._strings_off = strings_off
+        self._columns_off = columns_off
+        self._offsets_off = offsets_off
+        self._text_off = text_off
+        self._report_off = report_off
+        self._end_off = end_off
+
+    def _strings(self):
+        mm = self._mm
+        (n,) = struct.unpack_from("<I", mm, self._strings_off)
+        pos = self._strings_off + 4
+        out = []
+        for _ in range(n):
+            (ln,) = struct.unpack_from("<H", mm, pos)
+            pos += 2
+            out.append(mm[pos:pos + ln].decode('utf-8'))
+            pos += ln
+        return out
+
+    def _column(self, typecode, start, count):
+        col = array(typecode)
+        col.frombytes(self._mm[start:start + col.itemsize * count])
+        if sys.byteorder != 'little':
+            col.byteswap()
+        return col, start + col.itemsize * count
+
+    def questions(self):
+        strings = self._strings()
+        n = self.count
+        pos = self._columns_off
+        ids, pos = self._column('I', pos, n)
+        pkgs, pos = self._column('I', pos, n)
+        levels, pos = self._column('I', pos, n)
+        topics, pos = self._column('I', pos, n)
+        answers, pos = self._column('h', pos, n)
+        flags, pos = self._column('B', pos, n)
+        self._offsets, _ = self._column('Q', self._offsets_off, n + 1)
+
+        def ref(i):
+            return None if i == NONE_REF else strings[i]
+
+        return [
+            LazyQuestion(self, i, ref(ids[i]), ref(pkgs[i]), ref(topics[i]), ref(levels[i]),
+                         None if answers[i] < 0 else answers[i], flags[i])
+            for i in range(n)
+        ]
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def text(self, pos):
+        if self._mm is None:
+            raise ClosedBankError(f"{self.path} is closed")
+        a = self._text_off + self._offsets[pos]
+        b = self._text_off + self._offsets[pos + 1]
+        return json.loads(self._mm[a:b].decode('utf-8'))
+
+    def report(self):
+        return json.loads(self._mm[self._report_off:self._end_off].decode('utf-8'))
+
+def load_bank(path=SOAL_BIN, expect_source=None):
+    """
+    Open a compiled bank and return (bank, questions, report); the caller
+    closes `bank` once the questions are no longer served.
+    Raises StaleBankError when expect_source (the current soal.json stamp)
+    differs from the one recorded at build time, ValueError when the file
+    is damaged. The bank is closed on any error.
+    """
+    bank = CompiledBank(path)
+    try:
+        if expect_source is not None and bank.source != tuple(expect_source):
+            raise StaleBankError(f"{path} is older than its source")
+        return bank, bank.questions(), bank.report()
+    except (struct.error, IndexError) as e:
+        bank.close()
+        raise ValueError(f"{path} is damaged: {e}") from e
+    except BaseException:
+        bank.close()
+        raise
+
+# ================= WRITE =================
+def build_bank(src=SOAL_FILE, dst=SOAL_BIN):
+    """Compile soal.json into the indexed format. Returns the number of questions."""
+    stamp = file_stamp(src)
+    data = load_json(src, default=[])
+    questions, report = compile_items(data if isinstance(data, list) else [])
+
+    strings = []
+    refs = {}
+
+    def ref(value):
+        if value is None:
+            return NONE_REF
+        value = str(value)
+        if value not in refs:
+            refs[value] = len(strings)
+            strings.append(value)
+        return refs[value]
+
+    n = len(questions)
+    cols = [array('I'), array('I'), array('I'), array('I'), array('h'), array('B')]
+    offsets = array('Q', [0])
+    text_parts = []
+    total = 0
+    for q in questions:
+        cols[0].append(ref(q.id))
+        cols[1].append(ref(q.package))
+        cols[2].append(ref(q.level))
+        cols[3].append(ref(q.topic))
+        cols[4].append(-1 if q.correct_answer is None else q.correct_answer)
+        cols[5].append(FLAG_PLAYABLE if q.playable else 0)
+        blob = json.dumps({k: getattr(q, k) for k in TEXT_FIELDS if getattr(q, k)},
+                          ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        text_parts.append(blob)
+        total += len(blob)
+        offsets.append(total)
+
+    string_blob = [struct.pack("<I", len(strings))]
+    for sv in strings:
+        b = sv.encode('utf-8')
+        string_blob.append(struct.pack("<H", len(b)) + b)
+    string_blob = b"".join(string_blob)
+
+    if sys.byteorder != 'little':
+        for col in cols + [offsets]:
+            col.byteswap()
+    column_blob = b"".join(col.tobytes() for col in cols)
+    offsets_blob = offsets.tobytes()
+    report_blob = json.dumps(report, ensure_ascii=False).encode('utf-8')
+
+    strings_off = HEADER.size
+    columns_off = strings_off + len(string_blob)
+    offsets_off = columns_off + len(column_blob)
+    text_off = offsets_off + len(offsets_blob)
+    report_off = text_off + total
+    end_off = report_off + len(report_blob)
+    src_mtime, src_size = stamp if stamp else (-1, -1)
+    header = HEADER.pack(MAGIC, VERSION, 0, n, strings_off, columns_off, offsets_off,
+                         text_off, report_off, end_off, src_mtime, src_size)
+
+    tmp = dst + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(header)
+        f.write(string_blob)
+        f.write(column_blob)
+        f.write(offsets_blob)
+        for blob in text_parts:
+            f.write(blob)
+        f.write(report_blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, dst)
+    return n
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    src = args[0] if len(args) > 0 else SOAL_FILE
+    dst = args[1] if len(args) > 1 else SOAL_BIN
+    count = build_bank(src, dst)
+    print(f"{count} soal -> {dst} ({os.path.getsize(dst)} bytes)")
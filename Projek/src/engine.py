@@ -0,0 +1,324 @@
+import datetime
+import threading
+import time
+import uuid
+
+from utils import (
+    load_index, load_questions_for_package, normalize_correct_answer,
+    pick_questions_with_fresh_priority, pick_questions_adaptive, SeenIndex, DailySets,
+    build_session, ConstraintError
+)
+from history_store import HistoryStats
+from analytics import Analytics, target_rating
+from review import ReviewScheduler
+
+# ================= CONFIG =================
+QUESTIONS_PER_LEVEL = 8
+SESSION_SECONDS = 75 * 60
+DAILY_NUM = 5
+DAILY_MIX = {"hard": 1, "medium": 2, "easy": 2}
+DAILY_POINTS = {"easy": 1, "medium": 2, "hard": 3}
+
+class QuizError(Exception):
+    """Raised when a session cannot be started or an action is not allowed."""
+
+# ================= STORAGE =================
+class MemoryStore:
+    """In-process history store with the same interface as HistoryStore."""
+
+    def __init__(self, records=None):
+        self.records = list(records or [])
+
+    def open(self):
+        return self
+
+    def iter_records(self):
+        return iter(list(self.records))
+
+    def load(self):
+        return list(self.records)
+
+    def append(self, record):
+        self.records.append(record)
+
+    def append_many(self, records):
+        self.records.extend(records)
+
+    def compact(self, records=None):
+        if records is not None:
+            self.records = list(records)
+
+    def clear(self):
+        self.records = []
+
+# ================= SESSION =================
+class QuizSession:
+    """
+    State of one quiz or daily session, independent of any UI.
+    Flow: current() -> answer(choice) -> advance() ... until advance() is False.
+    """
+
+    def __init__(self, questions, package, level=None, daily=False, user=None,
+                 seconds=SESSION_SECONDS, points=None, mode=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.user = user
+        self.package = package
+        self.level = level
+        self.daily = daily
+        self.mode = mode or ("daily" if daily else "quiz")
+        self.questions = list(questions)
+        self.seconds = seconds
+        self.points = points or DAILY_POINTS
+        self.started = datetime.datetime.now()
+
+        self.idx = 0
+        self.score = 0
+        self.daily_score = 0
+        self.daily_breakdown = {"easy": 0, "medium": 0, "hard": 0}
+        self.outcomes = []
+        self.answered = False
+        self.finished = False
+
+        # monotonic clock: immune to wall-clock changes and UI stalls
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + seconds
+        self._shown_at = self.started_at
+
+    def remaining(self, now=None):
+        """Seconds left before the deadline (float, never negative)."""
+        return max(0.0, self.deadline - (time.monotonic() if now is None else now))
+
+    def expired(self, now=None):
+        return self.remaining(now) <= 0
+
+    def current(self):
+        if self.finished or self.idx >= len(self.questions):
+            return None
+        return self.questions[self.idx]
+
+    @property
+    def total_score(self):
+        return self.daily_score if self.daily else self.score
+
+    def answer(self, choice):
+        """
+        Grade `choice` for the current question. Returns a dict with
+        correct, correct_answer, points and explanation.
+        """
+        q = self.current()
+        if q is None:
+            raise QuizError("Sesi sudah selesai")
+        if self.answered:
+            raise QuizError("Soal ini sudah dijawab")
+
+        correct = choice == q.get("correct_answer")
+        pts = 0
+        if correct:
+            if self.daily:
+                lvl = (q.get("level") or "easy").strip().lower()
+                pts = self.points.get(lvl, 1)
+                self.daily_score += pts
+                self.daily_breakdown[lvl] = self.daily_breakdown.get(lvl, 0) + pts
+            else:
+                pts = 1
+                self.score += 1
+
+        elapsed = time.monotonic() - self._shown_at
+        self.outcomes.append({"id": q.get("id"), "choice": choice, "correct": correct,
+                              "seconds": round(elapsed, 1)})
+        self.answered = True
+        return {
+            "correct": correct,
+            "correct_answer": q.get("correct_answer"),
+            "points": pts,
+            "explanation": q.get("explanation", "-"),
+        }
+
+    def advance(self):
+        """Move to the next question. Returns False when there is none left."""
+        if self.idx < len(self.questions) - 1:
+            self.idx += 1
+            self.answered = False
+            self._shown_at = time.monotonic()
+            return True
+        return False
+
+    def served_ids(self):
+        shown = self.questions[:self.idx + 1] if self.questions else []
+        return [q.get("id") for q in shown if q.get("id") is not None]
+
+    def record(self):
+        rec = {
+            "id": self.id,
+            "date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+            "package": self.package,
+            "score": self.total_score,
+            "level": self.level,
+            "daily": self.daily,
+            "mode": self.mode,
+            "all_ids": self.served_ids(),
+            "outcomes": self.outcomes,
+            "seconds": round(min(time.monotonic() - self.started_at, self.seconds), 1),
+        }
+        if self.user is not None:
+            rec["user"] = self.user
+        return rec
+
+# ================= ENGINE =================
+class QuizEngine:
+    """
+    Starts, grades and finishes sessions for any number of users.
+    - store: history storage (HistoryStore, MemoryStore or anything with
+      iter_records/append/clear)
+    - history: optional already-loaded records, saves a second read of the store
+    - review: ReviewScheduler (default: in memory for a MemoryStore, otherwise
+      persisted in the configured backend next to the history)
+    """
+
+    def __init__(self, store=None, history=None, daily_sets=None,
+                 questions_per_level=QUESTIONS_PER_LEVEL, seconds=SESSION_SECONDS, review=None):
+        self.store = store if store is not None else MemoryStore()
+        self.daily_sets = daily_sets or DailySets(DAILY_MIX, DAILY_NUM)
+        self.questions_per_level = questions_per_level
+        self.seconds = seconds
+        self.sessions = {}
+        self._seen = {}
+        self._lock = threading.Lock()
+        # stores with their own seen index / aggregates (SQLite) answer them by query
+        self._store_seen = getattr(self.store, "seen_index", None)
+        store_stats = getattr(self.store, "history_stats", None)
+        self.stats = store_stats() if store_stats else HistoryStats()
+        self.analytics = Analytics()
+        if review is None:
+            # an in-memory engine must not read or change the persisted schedule
+            review = ReviewScheduler(MemoryStore() if isinstance(self.store, MemoryStore) else None)
+        self.review = review
+        # first run with an existing history: build the schedule from it once
+        bootstrap_review = self.review.fresh
+        for rec in (history if history is not None else self.store.iter_records()):
+            if self._store_seen is None:
+                self._seen_for(rec.get("user")).add_record(rec)
+            if store_stats is None:
+                self.stats.add_record(rec)
+            self.analytics.add_record(rec)
+            if bootstrap_review:
+                self.review.add_record(rec, persist=False)
+        if bootstrap_review:
+            # also logs that the bootstrap ran, so an all-correct history is not replayed again
+            self.review.compact()
+
+    def _seen_for(self, user):
+        idx = self._seen.get(user)
+        if idx is None:
+            idx = self._store_seen(user) if self._store_seen else SeenIndex()
+            self._seen[user] = idx
+        return idx
+
+    def _register(self, session):
+        with self._lock:
+            self.sessions[session.id] = session
+        return session
+
+    def get(self, session_id):
+        return self.sessions.get(session_id)
+
+    def start_quiz(self, package, level, user=None):
+        pkg = (package or "").strip()
+        lvl = (level or "").strip().lower()
+        raw = load_questions_for_package(pkg)
+        if not raw:
+            raise QuizError(f"Soal tidak tersedia untuk paket: {package}")
+        db = normalize_correct_answer(raw) or []
+        with self._lock:
+            seen = self._seen_for(user)
+            questions = pick_questions_with_fresh_priority(db, self.questions_per_level, seen, pkg, lvl)
+        if not questions:
+            raise QuizError(f"Soal tidak tersedia untuk paket {package} pada level {level}")
+        return self._register(QuizSession(questions, pkg, lvl, daily=False, user=user, seconds=self.seconds))
+
+    def start_adaptive(self, package, level="all", user=None, success=0.7):
+        """Questions near the student's estimated ability (expected `success` rate)."""
+        pkg = (package or "").strip()
+        lvl = (level or "all").strip().lower()
+        with self._lock:
+            target = target_rating(self.analytics.ability(user), success)
+            questions = pick_questions_adaptive(self.questions_per_level, self._seen_for(user),
+                                                pkg, lvl, self.analytics, target)
+        if not questions:
+            raise QuizError(f"Soal tidak tersedia untuk paket: {package}")
+        return self._register(QuizSession(questions, pkg, lvl, daily=False, user=user,
+                                          seconds=self.seconds, mode="adaptive"))
+
+    def start_review(self, package, user=None):
+        """Previously wrong questions that are due again (SM-2 schedule)."""
+        pkg = (package or "").strip()
+        index = load_index()
+        with self._lock:
+            due = self.review.due(user, pkg or None, self.questions_per_level)
+        questions = [index.by_id[it.qid] for it in due if it.qid in index.by_id]
+        if not questions:
+            raise QuizError("Belum ada soal yang perlu diulang 🌸")
+        return self._register(QuizSession(questions, pkg, None, daily=False, user=user,
+                                          seconds=self.seconds, mode="review"))
+
+    def start_custom(self, constraints, total=None, package=None, user=None):
+        """
+        Session built from weighted package/level/topic constraints, e.g.
+        [{"topic": "matematika", "level": "hard", "share": 0.5}] (see utils.build_session).
+        Unsatisfiable constraints are reported as a QuizError naming each one.
+        """
+        pkg = (package or "").strip()
+        with self._lock:
+            try:
+                questions = build_session(total or self.questions_per_level, constraints,
+                                          pkg or None, self._seen_for(user))
+            except ConstraintError as e:
+                raise QuizError(str(e)) from e
+        return self._register(QuizSession(questions, pkg, None, daily=False, user=user,
+                                          seconds=self.seconds, mode="custom"))
+
+    def start_daily(self, package, user=None, date=None):
+        pkg = (package or "").strip()
+        questions = self.daily_sets.get(pkg, date)
+        if not questions:
+            raise QuizError("Soal daily tidak tersedia")
+        return self._register(QuizSession(questions, pkg, None, daily=True, user=user, seconds=self.seconds))
+
+    def answer(self, session, choice):
+        return session.answer(choice)
+
+    def finish(self, session):
+        """Close the session, persist its record and return it. Safe to call twice."""
+        with self._lock:
+            if session.finished:
+                return None
+            session.finished = True
+            self.sessions.pop(session.id, None)
+            rec = session.record()
+            self._seen_for(session.user).add_record(rec)
+            self.stats.add_record(rec)
+            self.analytics.add_record(rec)
+            self.review.add_record(rec)
+        self.store.append(rec)
+        return rec
+
+    def discard(self, session):
+        """Drop an unfinished session without recording it."""
+        with self._lock:
+            self.sessions.pop(session.id, None)
+
+    def history_page(self, offset=0, limit=50):
+        """(records newest first, total count) without loading the whole history."""
+        if hasattr(self.store, "page"):
+            return self.store.page(offset, limit), self.store.count()
+        records = self.store.load()
+        end = len(records) - offset
+        return list(reversed(records[max(0, end - limit):max(0, end)])), len(records)
+
+    def clear_history(self):
+        with self._lock:
+            self.store.clear()
+            self._seen = {}
+            self.stats.clear()
+            self.analytics.clear()
+            self.review.clear()
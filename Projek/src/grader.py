@@ -0,0 +1,308 @@
+"""
+Grade exported answer sheets in bulk.
+
+  python grader.py answers.csv more.jsonl -o results/ [--daily] [--papers tryout/papers.jsonl]
+
+Input rows (CSV with a header, or JSONL objects), either
+  one answer per row:   student, question (id), answer
+  one sheet per row:    student, paper, answers   e.g. "ABDC-E" ("-" or " " = blank),
+                        with paper numbers from papers.py (--papers)
+An answer is a letter, the choice text or a 0-based index; a bare number
+that is itself one of the choices means that choice (the import_bank rule).
+Answers matching no choice are counted as invalid, not as answered.
+
+The bank's answer key is compiled once into arrays indexed by question
+position (correct choice, points). Rows are streamed in chunks of CHUNK
+and each chunk is graded with one vectorized comparison (NumPy when it
+is installed, a plain loop otherwise), so memory is bounded by the number
+of students and questions, not by the number of rows.
+
+Points follow QuizSession: 1 per correct answer, or DAILY_POINTS by level
+with --daily.
+
+Output (in -o):
+  students.csv   student, questions, answered, correct, score, max_score
+  questions.csv  id, package, level, attempts, blank, correct, accuracy
+"""
+import os
+import sys
+import csv
+import json
+import argparse
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python grading below
+    np = None
+
+from utils import load_all_items, resolve_answer, _norm_pkg_name
+from engine import DAILY_POINTS
+
+CHUNK = 1 << 16
+BLANK = -1
+INVALID = -2
+STUDENT_KEYS = ("student", "user", "nama", "name")
+QUESTION_KEYS = ("question", "question_id", "id", "qid")
+ANSWER_KEYS = ("answer", "choice", "jawaban")
+
+# ================= ANSWER KEY =================
+class AnswerKey:
+    """Correct choice (-1 = unresolved) and points per question, indexed by bank position."""
+
+    def __init__(self, questions, daily=False, points=None):
+        points = points or DAILY_POINTS
+        self.questions = list(questions)
+        self.pos = {}
+        key = []
+        weight = []
+        for i, q in enumerate(self.questions):
+            self.pos.setdefault(q.id, i)
+            key.append(BLANK if q.correct_answer is None else q.correct_answer)
+            lvl = (q.level or "easy").strip().lower()
+            weight.append(points.get(lvl, 1) if daily else 1)
+        if np is not None:
+            self.key = np.array(key, dtype=np.int16)
+            self.weight = np.array(weight, dtype=np.float64)
+        else:
+            self.key = array('h', key)
+            self.weight = array('d', weight)
+
+    def __len__(self):
+        return len(self.questions)
+
+def parse_choice(raw, q):
+    """Choice index of a raw answer; BLANK when empty, INVALID when it is none of q's choices."""
+    if raw is None:
+        return BLANK
+    if isinstance(raw, str):
+        s = raw.strip()
+        if not s or s == "-":
+            return BLANK
+        idx = resolve_answer(s, q.choices)
+        # a bare number is a 0-based index unless it is itself one of the choices
+        if idx is None and s.isdigit() and int(s) < len(q.choices):
+            idx = int(s)
+    else:
+        idx = resolve_answer(raw, q.choices)
+    return INVALID if idx is None else idx
+
+# ================= READERS =================
+def _first(row, keys):
+    for k in keys:
+        v = row.get(k)
+        if v not in (None, ""):
+            return v
+    return None
+
+def iter_rows(path):
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8", newline="" if ext == ".csv" else None) as f:
+        if ext == ".csv":
+            for row in csv.DictReader(f):
+                yield {k.strip().lower(): v for k, v in row.items() if k}
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        yield None
+                        continue
+                    yield row if isinstance(row, dict) else None
+
+def load_papers(path):
+    """paper number -> question ids, from papers.py's papers.jsonl."""
+    papers = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rec = json.loads(line)
+                papers[str(rec["paper"])] = rec["ids"]
+    return papers
+
+def iter_answers(paths, papers=None, report=None):
+    """Yield (student, question id, raw answer) from answer or sheet rows."""
+    report = report if report is not None else {}
+    for path in paths:
+        for row in iter_rows(path):
+            if row is None:
+                report["bad_rows"] = report.get("bad_rows", 0) + 1
+                continue
+            student = _first(row, STUDENT_KEYS)
+            sheet = row.get("answers")
+            if sheet is not None and row.get("paper") not in (None, ""):
+                if student is None:
+                    report["bad_rows"] = report.get("bad_rows", 0) + 1
+                    continue
+                ids = (papers or {}).get(str(row["paper"]).strip())
+                if ids is None:
+                    report["unknown_paper"] = report.get("unknown_paper", 0) + 1
+                    continue
+                sheet = str(sheet)
+                for i, qid in enumerate(ids):
+                    yield student, qid, sheet[i] if i < len(sheet) else None
+                continue
+            qid = _first(row, QUESTION_KEYS)
+            if student is None or qid is None:
+                report["bad_rows"] = report.get("bad_rows", 0) + 1
+                continue
+            yield student, qid, _first(row, ANSWER_KEYS)
+
+# ================= GRADING =================
+class Grader:
+    """Per-student and per-question totals, updated one chunk of answers at a time."""
+
+    def __init__(self, key):
+        self.key = key
+        self.students = {}
+        self.names = []
+        self.unknown = 0
+        self.invalid = 0
+        n = len(key)
+        if np is not None:
+            self.q_attempts = np.zeros(n, dtype=np.int64)
+            self.q_blank = np.zeros(n, dtype=np.int64)
+            self.q_correct = np.zeros(n, dtype=np.int64)
+            self.s = {k: np.zeros(0) for k in ("questions", "answered", "correct", "score", "max_score")}
+        else:
+            self.q_attempts = array('q', bytes(8 * n))
+            self.q_blank = array('q', bytes(8 * n))
+            self.q_correct = array('q', bytes(8 * n))
+            self.s = {k: array('d') for k in ("questions", "answered", "correct", "score", "max_score")}
+
+    def _student(self, name):
+        i = self.students.get(name)
+        if i is None:
+            i = self.students[name] = len(self.names)
+            self.names.append(name)
+            if np is None:
+                for col in self.s.values():
+                    col.append(0.0)
+        return i
+
+    def grade(self, answers):
+        """Consume an iterable of (student, question id, raw answer)."""
+        spos, qpos, choice = array('q'), array('q'), array('h')
+        pos = self.key.pos
+        questions = self.key.questions
+        for student, qid, raw in answers:
+            qi = pos.get(qid)
+            if qi is None:
+                self.unknown += 1
+                continue
+            spos.append(self._student(student))
+            qpos.append(qi)
+            choice.append(parse_choice(raw, questions[qi]))
+            if len(spos) >= CHUNK:
+                self._chunk(spos, qpos, choice)
+                spos, qpos, choice = array('q'), array('q'), array('h')
+        if spos:
+            self._chunk(spos, qpos, choice)
+        return self
+
+    def _chunk(self, spos, qpos, choice):
+        if np is not None:
+            self._chunk_numpy(np.frombuffer(spos, dtype=np.int64), np.frombuffer(qpos, dtype=np.int64),
+                              np.frombuffer(choice, dtype=np.int16))
+            return
+        key, weight, s = self.key.key, self.key.weight, self.s
+        for si, qi, c in zip(spos, qpos, choice):
+            w = weight[qi]
+            self.q_attempts[qi] += 1
+            s["questions"][si] += 1
+            s["max_score"][si] += w
+            if c < 0:
+                if c == BLANK:
+                    self.q_blank[qi] += 1
+                else:
+                    self.invalid += 1
+                continue
+            s["answered"][si] += 1
+            if c == key[qi]:
+                self.q_correct[qi] += 1
+                s["correct"][si] += 1
+                s["score"][si] += w
+
+    def _chunk_numpy(self, spos, qpos, choice):
+        n = len(self.names)
+        for name, col in self.s.items():
+            if len(col) < n:
+                grown = np.zeros(max(n, 2 * len(col)))
+                grown[:len(col)] = col
+                self.s[name] = grown
+        k = self.key.key[qpos]
+        w = self.key.weight[qpos]
+        blank = choice == BLANK
+        answered = choice >= 0
+        ok = answered & (choice == k)
+        self.invalid += int(np.count_nonzero(choice == INVALID))
+        nq = len(self.key)
+        self.q_attempts += np.bincount(qpos, minlength=nq)
+        self.q_blank += np.bincount(qpos[blank], minlength=nq)
+        self.q_correct += np.bincount(qpos[ok], minlength=nq)
+        s = self.s
+        s["questions"][:n] += np.bincount(spos, minlength=n)
+        s["answered"][:n] += np.bincount(spos[answered], minlength=n)
+        s["correct"][:n] += np.bincount(spos[ok], minlength=n)
+        s["score"][:n] += np.bincount(spos, weights=np.where(ok, w, 0.0), minlength=n)
+        s["max_score"][:n] += np.bincount(spos, weights=w, minlength=n)
+
+    # ----------------- results -----------------
+    def student_rows(self):
+        s = self.s
+        for i, name in enumerate(self.names):
+            yield (name, int(s["questions"][i]), int(s["answered"][i]), int(s["correct"][i]),
+                   float(s["score"][i]), float(s["max_score"][i]))
+
+    def question_rows(self):
+        for i, q in enumerate(self.key.questions):
+            n = int(self.q_attempts[i])
+            if not n:
+                continue
+            c = int(self.q_correct[i])
+            yield (q.id, _norm_pkg_name(q.package), q.level or "", n, int(self.q_blank[i]), c, round(c / n, 4))
+
+def write_results(grader, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "students.csv"), "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["student", "questions", "answered", "correct", "score", "max_score"])
+        for row in grader.student_rows():
+            w.writerow(row[:4] + tuple(f"{v:g}" for v in row[4:]))
+    with open(os.path.join(out_dir, "questions.csv"), "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["id", "package", "level", "attempts", "blank", "correct", "accuracy"])
+        w.writerows(grader.question_rows())
+
+def grade_files(paths, daily=False, papers=None):
+    """Grade answer files against the current bank. Returns (Grader, report)."""
+    report = {}
+    grader = Grader(AnswerKey(load_all_items(), daily=daily))
+    grader.grade(iter_answers(paths, papers, report))
+    report["unknown_question"] = grader.unknown
+    report["invalid_answer"] = grader.invalid
+    report["students"] = len(grader.names)
+    report["engine"] = "numpy" if np is not None else "python"
+    return grader, report
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Grade answer sheets in bulk")
+    ap.add_argument("inputs", nargs="+", help=".csv or .jsonl answer files")
+    ap.add_argument("-o", "--out", default="results", help="output directory")
+    ap.add_argument("--daily", action="store_true", help="weight points by level (DAILY_POINTS)")
+    ap.add_argument("--papers", help="papers.jsonl from papers.py, for sheet rows")
+    args = ap.parse_args(argv)
+
+    papers = load_papers(args.papers) if args.papers else None
+    grader, report = grade_files(args.inputs, args.daily, papers)
+    write_results(grader, args.out)
+    print(f"{report['students']} siswa dinilai -> {args.out} ({report['engine']})")
+    for k, v in sorted(report.items()):
+        if k not in ("students", "engine") and v:
+            print(f"  {k}: {v}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
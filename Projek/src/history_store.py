@@ -0,0 +1,256 @@
+import os
+import json
+import threading
+from collections import deque
+
+from tracing import span
+from utils import ensure_dirs, load_json, HISTORY_FILE, HISTORY_LOG, STORAGE_BACKEND
+
+def _dump_line(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+def _fsync_dir(path):
+    # Makes a rename durable; not supported on every platform (e.g. Windows).
+    try:
+        fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class HistoryStore:
+    """
+    Append-only session history kept as JSON Lines (one record per line).
+    - append() writes a single line and fsyncs it: O(1) I/O per session.
+    - A torn last line (crash mid-append) is cut off when the store opens,
+      so earlier records are never lost.
+    - compact() rewrites the log through a temp file + rename.
+    - On first use an existing history.json array is migrated once.
+    """
+
+    def __init__(self, path=HISTORY_LOG, legacy_path=HISTORY_FILE):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._opened = False
+        self._offsets = None
+
+    # ----------------- setup -----------------
+    def open(self):
+        with self._lock:
+            if self._opened:
+                return self
+            ensure_dirs()
+            if not os.path.exists(self.path):
+                self._migrate()
+            else:
+                self._repair_tail()
+            self._opened = True
+        return self
+
+    def _migrate(self):
+        records = []
+        if self.legacy_path and os.path.exists(self.legacy_path):
+            data = load_json(self.legacy_path, default=[])
+            records = [r for r in data if isinstance(r, dict)] if isinstance(data, list) else []
+        self._write_atomic(records)
+
+    def _repair_tail(self):
+        with open(self.path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+            # Walk back to the last complete line and drop the partial one.
+            pos = size
+            chunk = 4096
+            while pos > 0:
+                start = max(0, pos - chunk)
+                f.seek(start)
+                buf = f.read(pos - start)
+                nl = buf.rfind(b'\n')
+                if nl != -1:
+                    f.truncate(start + nl + 1)
+                    break
+                pos = start
+            else:
+                f.truncate(0)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_atomic(self, records):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for r in records:
+                f.write(_dump_line(r))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        _fsync_dir(self.path)
+
+    # ----------------- reading -----------------
+    def iter_records(self):
+        """
+        Stream every readable record. A complete pass also records the byte
+        offset of each record, which page() uses to seek straight to a page.
+        """
+        self.open()
+        offsets = []
+        with open(self.path, 'rb') as f:
+            pos = 0
+            for raw in f:
+                start = pos
+                pos += len(raw)
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    continue
+                if isinstance(rec, dict):
+                    offsets.append(start)
+                    yield rec
+        with self._lock:
+            self._offsets = offsets
+
+    def load(self):
+        return list(self.iter_records())
+
+    def _ensure_offsets(self):
+        if self._offsets is None:
+            for _ in self.iter_records():
+                pass
+        return self._offsets
+
+    def count(self):
+        return len(self._ensure_offsets())
+
+    def page(self, offset=0, limit=50):
+        """Records newest first, skipping `offset` records, at most `limit`."""
+        offsets = self._ensure_offsets()
+        end = len(offsets) - offset
+        start = max(0, end - limit)
+        out = []
+        if end <= 0:
+            return out
+        with open(self.path, 'rb') as f:
+            for pos in reversed(offsets[start:end]):
+                f.seek(pos)
+                out.append(json.loads(f.readline().decode('utf-8')))
+        return out
+
+    # ----------------- writing -----------------
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        if not records:
+            return
+        lines = [_dump_line(r).encode('utf-8') for r in records]
+        self.open()
+        with self._lock, span("history.append", file=os.path.basename(self.path), records=len(records)):
+            with open(self.path, 'ab') as f:
+                pos = f.seek(0, os.SEEK_END)
+                f.write(b''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            if self._offsets is not None:
+                for line in lines:
+                    self._offsets.append(pos)
+                    pos += len(line)
+
+    def compact(self, records=None):
+        """Rewrite the log atomically, keeping `records` (default: all readable records)."""
+        if records is None:
+            records = self.load()
+        self.open()
+        with self._lock, span("history.compact", file=os.path.basename(self.path), records=len(records)):
+            self._write_atomic(records)
+            self._offsets = None
+
+    def clear(self):
+        self.compact([])
+
+class HistoryStats:
+    """
+    Per-package aggregates over the history, updated one record at a time:
+    attempts, mean and best score, and a trend (mean of the last TREND
+    scores minus the mean of the TREND before them). Daily sessions score
+    weighted points (DAILY_POINTS) and other sessions one point per correct
+    answer, so the two are aggregated separately, keyed (package, daily).
+    """
+
+    TREND = 5
+
+    def __init__(self):
+        self.packages = {}
+
+    @classmethod
+    def from_history(cls, history):
+        stats = cls()
+        for rec in history or []:
+            stats.add_record(rec)
+        return stats
+
+    @staticmethod
+    def package_key(package):
+        """Name a record's package is aggregated under."""
+        return str(package or '-').strip() or '-'
+
+    def add_record(self, rec):
+        key = (self.package_key(rec.get('package')), bool(rec.get('daily')))
+        try:
+            score = float(rec.get('score') or 0)
+        except (TypeError, ValueError):
+            score = 0.0
+        st = self.packages.get(key)
+        if st is None:
+            st = self.packages[key] = {'attempts': 0, 'total': 0.0, 'best': score,
+                                       'recent': deque(maxlen=2 * self.TREND)}
+        st['attempts'] += 1
+        st['total'] += score
+        st['best'] = max(st['best'], score)
+        st['recent'].append(score)
+
+    def set_aggregate(self, package, attempts, total, best, recent, daily=False):
+        """Seed one package from precomputed values (e.g. an SQL aggregate); recent is oldest first."""
+        self.packages[(package, bool(daily))] = {'attempts': attempts, 'total': float(total or 0),
+                                                 'best': float(best or 0),
+                                                 'recent': deque(recent, maxlen=2 * self.TREND)}
+
+    def summary(self, package, daily=False):
+        st = self.packages.get((package, bool(daily)))
+        if st is None:
+            return None
+        recent = list(st['recent'])
+        last, prev = recent[-self.TREND:], recent[:-self.TREND]
+        trend = (sum(last) / len(last) - sum(prev) / len(prev)) if prev else None
+        return {
+            'package': package,
+            'daily': bool(daily),
+            'attempts': st['attempts'],
+            'mean': st['total'] / st['attempts'],
+            'best': st['best'],
+            'trend': trend,
+        }
+
+    def summaries(self):
+        return [self.summary(p, daily) for p, daily in sorted(self.packages)]
+
+    def clear(self):
+        self.packages = {}
+
+def open_history_store():
+    """History store for the configured STORAGE_BACKEND."""
+    if STORAGE_BACKEND == 'sqlite':
+        from sqlite_store import SQLiteHistoryStore
+        return SQLiteHistoryStore().open()
+    return HistoryStore().open()
@@ -0,0 +1,327 @@
+"""
+Import and validate question files into a normalized bank.
+
+  python import_bank.py new_soal.csv more.jsonl -o ../data/soal.json --report report.json
+
+Inputs are streamed one question at a time, so the file size does not
+matter:
+  .json   a JSON array of question objects
+  .jsonl  one question object per line
+  .csv    columns id, package, topic, level, question, reading, explanation,
+          correct_answer (letter, choice text or 0-based index) and either `choices` ("A | B | C") or choice_a..choice_e
+
+Each question is checked for schema, answer resolution (the same rules as
+the app: index, letter or choice text), duplicate ids and near-duplicate
+question text. Memory stays bounded: ids and texts are remembered as 8-byte
+hashes (each text with the output position of its first question, not
+its id), and the report keeps at most REPORT_LIMIT examples per problem.
+
+The bank is written to a temp file and moved over -o only when every input
+could be read; otherwise -o is left as it was and the exit status is 1.
+"""
+import os
+import re
+import csv
+import sys
+import json
+import hashlib
+import argparse
+from collections import Counter
+
+from utils import Question
+
+CHUNK = 1 << 16
+REPORT_LIMIT = 200
+LEVELS = ("easy", "medium", "hard")
+CHOICE_COLUMNS = ("choice_a", "choice_b", "choice_c", "choice_d", "choice_e")
+
+# ================= READERS =================
+def iter_json_array(f):
+    """Yield the elements of a top-level JSON array without loading the file."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def more():
+        nonlocal buf, pos, eof
+        chunk = f.read(CHUNK)
+        buf, pos = buf[pos:] + chunk, 0
+        eof = not chunk
+
+    def peek():
+        """Next non-whitespace character, '' at the end of the input."""
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf) or eof:
+                return buf[pos] if pos < len(buf) else ""
+            more()
+
+    c = peek()
+    if not c:
+        return
+    if c != "[":
+        raise ValueError("expected a JSON array")
+    pos += 1
+    if peek() == "]":
+        return
+    while True:
+        c = peek()
+        if not c:
+            raise ValueError("unexpected end of JSON array")
+        if c in ",]":
+            raise ValueError(f"expected a value, got {c!r}")
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+                more()
+                continue
+            # a value ending exactly at the end of the buffer (a number) may go on in the next chunk
+            if end == len(buf) and not eof:
+                more()
+                continue
+            break
+        yield obj
+        pos = end
+        c = peek()
+        if c == "]":
+            return
+        if not c:
+            raise ValueError("unexpected end of JSON array")
+        if c != ",":
+            raise ValueError(f"expected ',' or ']', got {c!r}")
+        pos += 1
+        if pos > CHUNK:
+            buf, pos = buf[pos:], 0
+
+def iter_jsonl(f):
+    for lineno, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"line {lineno}: {e}")
+
+def iter_csv(f):
+    for row in csv.DictReader(f):
+        row = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+        if row.get("choices"):
+            choices = [c.strip() for c in row["choices"].split("|")]
+        else:
+            choices = [row[c] for c in CHOICE_COLUMNS if row.get(c)]
+        item = {k: row.get(k) or None for k in ("id", "package", "topic", "level", "question",
+                                                 "reading", "explanation", "correct_answer")}
+        item["choices"] = choices
+        ca = item["correct_answer"]
+        # a bare number is a 0-based index unless it is itself one of the choices
+        if ca and ca.isdigit() and ca not in choices:
+            item["correct_answer"] = int(ca)
+        yield item
+
+def iter_items(path):
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8", newline="" if ext == ".csv" else None) as f:
+        if ext == ".csv":
+            yield from iter_csv(f)
+        elif ext == ".jsonl":
+            yield from iter_jsonl(f)
+        else:
+            yield from iter_json_array(f)
+
+# ================= VALIDATION =================
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+_WORDS = re.compile(r"\w+", re.UNICODE)
+
+def text_fingerprint(question, choices=()):
+    """Hash of the question text ignoring case, spacing and punctuation."""
+    words = _WORDS.findall(str(question or "").lower())
+    words += ["|"] + sorted(w for c in choices for w in _WORDS.findall(str(c).lower()))
+    return _digest(" ".join(words))
+
+class Report:
+    def __init__(self):
+        self.counts = Counter()
+        self.examples = {}
+        self.read = 0
+        self.written = 0
+        self.committed = False
+
+    def add(self, kind, where, detail=""):
+        self.counts[kind] += 1
+        bucket = self.examples.setdefault(kind, [])
+        if len(bucket) < REPORT_LIMIT:
+            bucket.append({"where": where, "detail": detail})
+
+    def to_dict(self):
+        return {
+            "read": self.read,
+            "written": self.written,
+            "committed": self.committed,
+            "problems": dict(self.counts),
+            "examples": self.examples,
+        }
+
+class Validator:
+    """
+    Checks one item at a time. Errors reject the item; warnings keep it.
+    - errors: not an object, missing id/package/question, fewer than two
+      choices, unresolvable correct_answer, duplicate id
+    - warnings: unknown level, near-duplicate text (rejected with drop_near_duplicates)
+    """
+
+    def __init__(self, report, drop_near_duplicates=False):
+        self.report = report
+        self.drop_near = drop_near_duplicates
+        self.ids = set()
+        self.texts = {}  # fingerprint -> 1-based position of its first item in the output
+
+    def check(self, item, where):
+        r = self.report
+        if isinstance(item, Exception):
+            r.add("parse_error", where, str(item))
+            return None
+        if not isinstance(item, dict):
+            r.add("not_an_object", where)
+            return None
+        q = Question.compile(item)
+        where = f"{where} id={q.id!r}"
+        if not q.id:
+            r.add("missing_id", where)
+            return None
+        if not str(q.package or "").strip():
+            r.add("missing_package", where)
+            return None
+        if not (q.question or q.reading):
+            r.add("missing_question", where)
+            return None
+        if len(q.choices) < 2:
+            r.add("too_few_choices", where, f"{len(q.choices)} choice(s)")
+            return None
+        if q.correct_answer is None:
+            r.add("unresolved_answer", where, f"{item.get('correct_answer')!r} not in choices")
+            return None
+        key = _digest(str(q.id))
+        if key in self.ids:
+            r.add("duplicate_id", where)
+            return None
+        level = str(q.level or "").strip().lower()
+        if level not in LEVELS:
+            r.add("unknown_level", where, repr(q.level))
+
+        fp = text_fingerprint(q.question or q.reading, q.choices)
+        first = self.texts.get(fp)
+        if first is not None:
+            r.add("near_duplicate", where, f"same text as output item #{first}")
+            if self.drop_near:
+                return None
+        else:
+            self.texts[fp] = len(self.ids) + 1
+        self.ids.add(key)
+
+        out = q.to_dict()
+        out["choices"] = list(q.choices)
+        out["package"] = str(q.package).strip()
+        if level in LEVELS:
+            out["level"] = level
+        return out
+
+# ================= WRITERS =================
+class BankWriter:
+    """Streams normalized items to .json (array) or .jsonl, via a temp file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.jsonl = path.lower().endswith(".jsonl")
+        self.tmp = path + ".tmp"
+        self.f = open(self.tmp, "w", encoding="utf-8")
+        self.first = True
+        if not self.jsonl:
+            self.f.write("[")
+
+    def write(self, item):
+        line = json.dumps(item, ensure_ascii=False)
+        if self.jsonl:
+            self.f.write(line + "\n")
+        else:
+            self.f.write(("\n  " if self.first else ",\n  ") + line)
+        self.first = False
+
+    def close(self):
+        """Finish the file and move it over `path`."""
+        if not self.jsonl:
+            self.f.write("\n]\n")
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        """Drop the temp file; `path` is left as it was."""
+        self.f.close()
+        try:
+            os.remove(self.tmp)
+        except OSError:
+            pass
+
+def import_files(paths, output, drop_near_duplicates=False):
+    """
+    Validate `paths` in order and write the accepted questions to `output`.
+    `output` is only replaced when every input could be read
+    (report.committed); otherwise it is left untouched. Returns the Report.
+    """
+    report = Report()
+    validator = Validator(report, drop_near_duplicates)
+    writer = BankWriter(output)
+    try:
+        for path in paths:
+            try:
+                for n, item in enumerate(iter_items(path), 1):
+                    report.read += 1
+                    out = validator.check(item, f"{os.path.basename(path)}#{n}")
+                    if out is not None:
+                        writer.write(out)
+                        report.written += 1
+            except (OSError, ValueError) as e:
+                report.add("unreadable_file", path, str(e))
+    except BaseException:
+        writer.abort()
+        raise
+    if report.counts["unreadable_file"]:
+        writer.abort()
+    else:
+        writer.close()
+        report.committed = True
+    return report
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Validate and normalize question files")
+    ap.add_argument("inputs", nargs="+", help=".json, .jsonl or .csv files")
+    ap.add_argument("-o", "--output", required=True, help="normalized bank (.json or .jsonl)")
+    ap.add_argument("--report", help="write the validation report here (JSON)")
+    ap.add_argument("--drop-near-duplicates", action="store_true")
+    args = ap.parse_args(argv)
+
+    report = import_files(args.inputs, args.output, args.drop_near_duplicates)
+    data = report.to_dict()
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    if report.committed:
+        print(f"{report.read} dibaca, {report.written} ditulis -> {args.output}")
+    else:
+        print(f"error: ada file yang tidak bisa dibaca, {args.output} tidak diubah", file=sys.stderr)
+    for kind, n in sorted(report.counts.items()):
+        print(f"  {kind}: {n}")
+    return 0 if report.committed else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,21 +11,97 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import random
 import datetime
-import uuid 
-
-from utils import (
-    ensure_dirs, load_questions_for_package, normalize_correct_answer,
-    pick_questions_with_fresh_priority, pick_daily_challenge_by_level,
-    load_json, save_json, HISTORY_FILE, list_packages_from_soal
-)
+import math
+import queue
+import sys
+import threading
+import time
+import traceback
+
+from utils import ensure_dirs, get_bank, load_index, list_packages_from_soal, list_topics, search_questions
+from history_store import open_history_store
+from engine import QuizEngine, QuizError
+import tracing
+from tracing import traced, event
 
 # ================= CONFIG =================
-ensure_dirs()
+HISTORY_PAGE_SIZE = 25
+STARTUP_BUDGET = 1.5
+STARTUP_POLL_MS = 30
+DIAGNOSTICS_MS = 1000
+SEARCH_LIMIT = 50
+
+# ================= ANIMASI =================
+class ConfettiAnimation:
+    """
+    Falling-flower animation driven by a single after() job per frame.
+    - every frame moves all live particles in one batch
+    - at most MAX_PARTICLES are alive at once
+    - stop() cancels the pending job and removes the particles
+    """
+
+    FLOWERS = ["🌸", "🌷", "✨", "🎀", "🌹"]
+    MAX_PARTICLES = 40
+    FRAME_MS = 30
+
+    def __init__(self, root):
+        self.root = root
+        self.canvas = None
+        self.particles = []
+        self.job = None
+
+    def start(self, canvas, delay=0, count=20):
+        self.stop()
+        self.canvas = canvas
+        self.job = self.root.after(delay, lambda: self._spawn(count))
+
+    def _spawn(self, count):
+        self.job = None
+        if not self._alive():
+            return
+        width = max(self.canvas.winfo_width(), 1000)
+        for _ in range(min(count, self.MAX_PARTICLES - len(self.particles))):
+            y = random.randint(-200, -50)
+            item = self.canvas.create_text(random.randint(0, width), y, text=random.choice(self.FLOWERS),
+                                           font=("Arial", 18), fill="#FFB6C1")
+            self.particles.append([item, y, random.randint(2, 5)])
+        self.job = self.root.after(self.FRAME_MS, self._frame)
+
+    def _frame(self):
+        self.job = None
+        if not self._alive():
+            self.particles = []
+            return
+        bottom = max(self.canvas.winfo_height(), 800)
+        live = []
+        for p in self.particles:
+            item, y, speed = p
+            y += speed
+            if y < bottom:
+                self.canvas.move(item, 0, speed)
+                p[1] = y
+                live.append(p)
+            else:
+                self.canvas.delete(item)
+        self.particles = live
+        if live:
+            self.job = self.root.after(self.FRAME_MS, self._frame)
 
-QUESTIONS_PER_LEVEL = 8
-SESSION_SECONDS = 75 * 60
-DAILY_NUM = 5
-DAILY_POINTS = {"easy": 1, "medium": 2, "hard": 3}
+    def _alive(self):
+        try:
+            return self.canvas is not None and bool(self.canvas.winfo_exists())
+        except tk.TclError:
+            return False
+
+    def stop(self):
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+        if self.particles and self._alive():
+            for item, _, _ in self.particles:
+                self.canvas.delete(item)
+        self.particles = []
+        self.canvas = None
 
 # ================= APP =================
 class QuizApp(tk.Tk):
@@ -37,66 +113,116 @@ class QuizApp(tk.Tk):
         except Exception:
             pass
 
+        self._started = time.perf_counter()
+        self.startup_times = {}
         self._style()
-
-        self.container = ttk.Frame(self)
-        self.container.pack(fill="both", expand=True)
-
-        self.history = load_json(HISTORY_FILE, [])
-        self.packages = list_packages_from_soal()
+        self.confetti = ConfettiAnimation(self)
+
+        # cached screens and the container for one-off screens share one grid cell
+        self.stack = ttk.Frame(self)
+        self.stack.pack(fill="both", expand=True)
+        self.stack.grid_rowconfigure(0, weight=1)
+        self.stack.grid_columnconfigure(0, weight=1)
+        self.container = ttk.Frame(self.stack)
+        self.container.grid(row=0, column=0, sticky="nsew")
+
+        # filled in by the loader thread, see _start_loading
+        self.engine = None
+        self.packages = []
+        self.ready = False
+        self._data_buttons = []
+
+        # screen cache: key -> (frame, inputs); see _show_screen
+        self.screens = {}
+        self.versions = {"packages": 0, "history": 0}
 
         # state
-        self.questions = []
-        self.idx = 0
-        self.score = 0
-        self.daily_score = 0
-        self.daily_breakdown = {"easy": 0, "medium": 0, "hard": 0}
-        self.is_daily = False
+        self.session = None
         self.showing_explanation = False
 
         self.timer_label = None
-        self.remaining = SESSION_SECONDS
+        self.q_main = None
+        self.radio = []
         self.timer_job = None
+        self._timer_shown = None
 
-        self.current_package = None
-        self.current_level = None
+        self.diagnostics = None
+        self.bind("<F12>", lambda _e: self._diagnostics())
 
         self._home()
-    def _style(self):
-        s = ttk.Style()
-        s.theme_use("clam")
-        s.configure("Choice.TRadiobutton", background="white", foreground="#8B4C39", font=("Segoe UI", 11), padding=10)
-        s.configure("TButton", font=("Baskerville", 12))
+        self.startup_times["ui"] = time.perf_counter() - self._started
+        self.after_idle(self._mark_first_frame)
+        self._start_loading()
+
+    # ================= STARTUP =================
+    def _mark_first_frame(self):
+        self.startup_times["first_frame"] = time.perf_counter() - self._started
+
+    def _start_loading(self):
+        """Load bank, packages and history off the Tk thread; _poll_loading picks up the result."""
+        self._loaded = queue.Queue()
+        threading.Thread(target=self._load_data, name="startup-loader", daemon=True).start()
+        self.after(STARTUP_POLL_MS, self._poll_loading)
+
+    def _load_data(self):
+        # runs on the loader thread: no Tk calls here
+        times = {}
+        try:
+            t = time.perf_counter()
+            ensure_dirs()
+            load_index()
+            times["bank"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            packages = list_packages_from_soal()
+            times["packages"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            engine = QuizEngine(open_history_store())
+            times["history"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            engine.daily_sets.precompute(packages)
+            times["daily"] = time.perf_counter() - t
+            self._loaded.put((engine, packages, times))
+        except Exception:
+            self._loaded.put(traceback.format_exc())
 
-    def clear(self):
-        for widget in self.container.winfo_children():
-            widget.destroy()
+    def _poll_loading(self):
+        try:
+            result = self._loaded.get_nowait()
+        except queue.Empty:
+            self.after(STARTUP_POLL_MS, self._poll_loading)
+            return
+        if isinstance(result, str):
+            print(result, file=sys.stderr)
+            messagebox.showerror("Error", "Gagal memuat data soal. Lihat log untuk detail.")
+            return
+        self.engine, self.packages, times = result
+        self._bump("packages")
+        self._bump("history")
+        self.startup_times.update(times)
+        self.startup_times["ready"] = time.perf_counter() - self._started
+        self.ready = True
+        self._schedule_daily_refresh()
+        self._log_startup()
+        for btn in self._data_buttons:
+            if btn.winfo_exists():
+                btn.config(state="normal")
+        self._data_buttons = []
+
+    def _log_startup(self):
+        t = self.startup_times
+        event("startup", budget_ms=STARTUP_BUDGET * 1000, **{k: round(v * 1000, 1) for k, v in t.items()})
+        if t["ready"] > STARTUP_BUDGET:
+            # only a slow start is worth a line on stderr when tracing is off
+            parts = " ".join(f"{k}={t[k] * 1000:.0f}ms" for k in
+                             ("ui", "first_frame", "bank", "packages", "history", "daily", "ready") if k in t)
+            print(f"[startup] {parts} (over budget)", file=sys.stderr)
 
-        self.after_cancel(self.start_canvas_confetti)
     # ================= BAGIAN ANIMASI =================
-    def start_canvas_confetti(self):
-        flowers = ["🌸", "🌷", "✨", "🎀", "🌹"]
-        for _ in range(20): 
-            x = random.randint(0, 1000)
-            y = random.randint(-200, -50)
-            f_text = random.choice(flowers)
-            
-           
-            flower_id = self.content_canvas.create_text(x, y, text=f_text, font=("Arial", 18), fill="#FFB6C1")
-            
-            self.animate_canvas_flower(flower_id, random.randint(2, 5))
-
-    def animate_canvas_flower(self, item_id, speed):
-        try:
-            self.content_canvas.move(item_id, 0, speed)
-            pos = self.content_canvas.coords(item_id)
-            
-            if pos[1] < 800: 
-                self.after(30, lambda: self.animate_canvas_flower(item_id, speed))
-            else:
-                self.content_canvas.delete(item_id)
-        except:
-            pass
+    def start_canvas_confetti(self, canvas=None, delay=0):
+        self.confetti.start(canvas or self.content_canvas, delay)
 
     # ================= STYLE =================
     def _style(self):
@@ -134,14 +260,57 @@ class QuizApp(tk.Tk):
         )
         s.map("Choice.TRadiobutton", background=[("active", hover)])
 
+        s.configure("History.Treeview", background="white", fieldbackground="white",
+                    foreground="#8B4C39", font=("Arial", 9), rowheight=24)
+        s.configure("History.Treeview.Heading", background="#FFB6C1", foreground="white",
+                    font=("Arial", 10, "bold"))
+
     # ================= UTILS =================
     def clear(self):
+        """Empty the one-off screen container (question, result, search) and bring it to the front."""
+        self.confetti.stop()
         for w in self.container.winfo_children():
             w.destroy()
+        self.container.tkraise()
+
+    def _version(self, name):
+        # "bank" follows the question file itself (topics, counts), not just the package names
+        if name == "bank":
+            return get_bank().version()
+        return self.versions[name]
+
+    def _bump(self, name):
+        """Mark an input (packages, history) as changed; screens built from it rebuild on next show."""
+        self.versions[name] += 1
+
+    def _show_screen(self, key, build, *inputs):
+        """
+        Raise the cached screen `key`. It is built with build(frame) the first
+        time and again only when the versions of `inputs` ("packages",
+        "history" or "bank") changed since.
+        """
+        self.clear()
+        stamp = tuple(self._version(name) for name in inputs)
+        entry = self.screens.get(key)
+        if entry is not None and (entry[1] != stamp or not entry[0].winfo_exists()):
+            entry[0].destroy()
+            entry = None
+        if entry is None:
+            frame = ttk.Frame(self.stack)
+            frame.grid(row=0, column=0, sticky="nsew")
+            build(frame)
+            entry = self.screens[key] = (frame, stamp)
+        entry[0].tkraise()
+        return entry[0]
+
+    def _refresh_packages(self):
+        packages = list_packages_from_soal()
+        if packages != self.packages:
+            self.packages = packages
+            self._bump("packages")
 
     # ================= TIMER =================
-    def start_timer(self):
-       
+    def stop_timer(self):
         if self.timer_job:
             try:
                 self.after_cancel(self.timer_job)
@@ -149,27 +318,30 @@ class QuizApp(tk.Tk):
                 pass
             self.timer_job = None
 
-        self.remaining = SESSION_SECONDS
-        self.timer_job = self.after(1000, self._tick)
+    def start_timer(self):
+        """The deadline lives on the session (monotonic clock); this only refreshes the label."""
+        self.stop_timer()
+        self._timer_shown = None
+        self.timer_job = self.after(0, self._tick)
 
     def _tick(self):
-        try:
-            m, s = divmod(self.remaining, 60)
-            if self.timer_label and getattr(self.timer_label, "winfo_exists", lambda: False)():
-                try:
-                    self.timer_label.config(text=f"⏱ {m:02d}:{s:02d}")
-                except tk.TclError:
-                    pass
-        except Exception:
-            pass
+        self.timer_job = None
+        if not self.session or self.session.finished:
+            return
 
-        if self.remaining <= 0:
-            if self.timer_job:
-                try:
-                    self.after_cancel(self.timer_job)
-                except Exception:
-                    pass
-                self.timer_job = None
+        remaining = self.session.remaining()
+        shown = math.ceil(remaining)
+        label = self.timer_label
+        if label is not None and (label, shown) != self._timer_shown:
+            try:
+                if label.winfo_exists():
+                    m, s = divmod(shown, 60)
+                    label.config(text=f"⏱ {m:02d}:{s:02d}")
+                    self._timer_shown = (label, shown)
+            except tk.TclError:
+                pass
+
+        if remaining <= 0:
             try:
                 messagebox.showinfo("Waktu Habis", "Sesi selesai")
             except Exception:
@@ -177,17 +349,17 @@ class QuizApp(tk.Tk):
             self.finish()
             return
 
-        self.remaining -= 1
-        try:
-            self.timer_job = self.after(1000, self._tick)
-        except Exception:
-            self.timer_job = None
+        # wake up just after the displayed second changes
+        delay = int((remaining - (shown - 1)) * 1000) + 5
+        self.timer_job = self.after(max(delay, 5), self._tick)
 
     # ================= HOME =================
     def _home(self):
-        self.clear()
-        
-        main_layout = tk.Frame(self.container, bg="#FFF0F5")
+        self._show_screen("home", self._build_home)
+        self.start_canvas_confetti(delay=500)
+
+    def _build_home(self, screen):
+        main_layout = tk.Frame(screen, bg="#FFF0F5")
         main_layout.pack(fill="both", expand=True)
 
         sidebar = tk.Frame(main_layout, bg="white", width=260, highlightbackground="#FFB6C1", highlightthickness=1)
@@ -201,14 +373,20 @@ class QuizApp(tk.Tk):
             ("🏠  Home", self._home),
             ("✨  Daily Challenge", self._daily_menu),
             ("📜  History", self._history),
+            ("🔍  Search", self._search),
             ("❌  Exit", self.quit)
         ]
 
+        # menus that need the bank or history stay disabled until the loader is done
+        self._data_buttons = []
         for txt, cmd in menu_items:
             btn = tk.Button(sidebar, text=txt, font=("Baskerville", 12), fg="#8B4C39", bg="white", 
                             relief="flat", activebackground="#FFF0F5", cursor="hand2", anchor="w", 
                             padx=25, pady=12, command=cmd)
             btn.pack(fill="x")
+            if cmd not in (self._home, self.quit) and not self.ready:
+                btn.config(state="disabled")
+                self._data_buttons.append(btn)
 
         self.content_canvas = tk.Canvas(main_layout, bg="#FFF0F5", highlightthickness=0)
         self.content_canvas.pack(side="right", fill="both", expand=True)
@@ -236,86 +414,19 @@ class QuizApp(tk.Tk):
                               bg="#FFB6C1", fg="white", relief="flat", padx=35, pady=15, 
                               command=self._package_menu, cursor="hand2")
         start_btn.pack()
+        if not self.ready:
+            start_btn.config(state="disabled")
+            self._data_buttons.append(start_btn)
 
-
-        self.after(500, self.start_canvas_confetti)
-    # ================= FITUR SCROLL SOAL =================
-    def _show_question(self):
-        self.clear()
-        if self.idx >= len(self.questions):
-            self.finish()
-            return
-
-        q = self.questions[self.idx]
-
-      
-        bottom_bar = tk.Frame(self.container, bg="#FFF0F5", height=80)
-        bottom_bar.pack(side="bottom", fill="x", pady=10)
-        bottom_bar.pack_propagate(False) 
-
-        scroll_container = tk.Frame(self.container, bg="#FFF0F5")
-        scroll_container.pack(side="top", fill="both", expand=True)
-
-        canvas = tk.Canvas(scroll_container, bg="#FFF0F5", highlightthickness=0)
-        scrollbar = ttk.Scrollbar(scroll_container, orient="vertical", command=canvas.yview)
-        
-        
-        self.scrollable_frame = tk.Frame(canvas, bg="#FFF0F5")
-        
-     
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-       
-        canvas_window = canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        
-      
-        def on_canvas_configure(e):
-            canvas.itemconfig(canvas_window, width=e.width)
-
-        canvas.bind("<Configure>", on_canvas_configure)
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-
-        
-        canvas.bind_all("<MouseWheel>", lambda e: canvas.yview_scroll(int(-1*(e.delta/120)), "units"))
-
-       
-        quiz_content = tk.Frame(self.scrollable_frame, bg="white", padx=40, pady=30,
-                                highlightbackground="#FFB6C1", highlightthickness=1)
-        quiz_content.pack(pady=20, padx=100, fill="x")
-
-        question_text = q.get("question", "")
-        tk.Label(quiz_content, text=f"Soal {self.idx + 1}", font=("Arial", 9, "bold"), 
-                 bg="white", fg="#DB7093").pack(anchor="w")
-        
-        tk.Label(quiz_content, text=question_text, font=("Georgia", 11), 
-                 bg="white", fg="#8B4C39", wraplength=700, justify="left").pack(anchor="w", pady=15)
-
-     
-        self.var_ans = tk.IntVar(value=-1)
-        for i, choice in enumerate(q.get("choices", [])):
-            rb = tk.Radiobutton(quiz_content, text=choice, variable=self.var_ans, value=i,
-                                font=("Segoe UI", 10), bg="white", fg="#8B4C39",
-                                activebackground="white", wraplength=600, justify="left")
-            rb.pack(anchor="w", pady=5)
-
-        # --- TOMBOL NAVIGASI (DI BOTTOM BAR) ---
-        tk.Button(bottom_bar, text="🏠 Menu", font=("Arial", 10), bg="white",
-                  command=self._home, padx=20, pady=5).pack(side="left", padx=50)
-
-        tk.Button(bottom_bar, text="Next Step ▷", font=("Arial", 10, "bold"), 
-                  bg="#FFB6C1", fg="white", command=self._next, padx=30, pady=5).pack(side="right", padx=50)
     # ================= PACKAGE =================
+    @traced("screen.package_menu")
     def _package_menu(self):
-        self.clear()
-        
-       
-        main_frame = tk.Frame(self.container, bg="#FFF0F5")
+        self._refresh_packages()
+        self._show_screen("packages", self._build_package_menu, "packages")
+
+    @traced("screen.package_menu.build")
+    def _build_package_menu(self, screen):
+        main_frame = tk.Frame(screen, bg="#FFF0F5")
         main_frame.pack(fill="both", expand=True, padx=40, pady=40)
 
         tk.Button(main_frame, text="← Back", font=("Baskerville", 10), fg="#8B4C39", bg="#FFF0F5", 
@@ -352,53 +463,93 @@ class QuizApp(tk.Tk):
             grid_container.grid_columnconfigure(j, weight=1)
 
     def _level_menu(self, package):
-        self.clear()
-        box = ttk.Frame(self.container)
+        self._show_screen(("level", package), lambda screen: self._build_level_menu(screen, package), "packages")
+
+    def _build_level_menu(self, screen, package):
+        box = ttk.Frame(screen)
         box.place(relx=0.5, rely=0.5, anchor="center")
 
         ttk.Label(box, text=f"Paket {package}", style="Title.TLabel").pack(pady=20)
         for lvl in ("easy", "medium", "hard"):
             ttk.Button(box, text=lvl.capitalize(), width=30,
                        command=lambda l=lvl: self.start_quiz(package, l)).pack(pady=6)
+        ttk.Button(box, text="✨ Adaptive", width=30,
+                   command=lambda: self.start_quiz(package, "adaptive")).pack(pady=6)
+        ttk.Button(box, text="🔁 Review", width=30,
+                   command=lambda: self.start_quiz(package, "review")).pack(pady=6)
+        ttk.Button(box, text="🧩 Per Topik", width=30,
+                   command=lambda: self._topic_menu(package)).pack(pady=6)
 
         ttk.Button(box, text="⬅ Kembali", command=self._package_menu).pack(pady=20)
 
-    # ================= START QUIZ =================
-    def start_quiz(self, package, level):
-        pkg = (package or "").strip()
-        lvl = (level or "").strip().lower()
-        self.current_package = pkg
-        self.current_level = lvl
-
-        raw = load_questions_for_package(pkg)
-        if not raw:
-            messagebox.showinfo("Info", f"Soal tidak tersedia untuk paket: {package}")
-            print(f"[DEBUG] start_quiz: package={pkg!r} raw_count=0")
-            return
+    def _topic_menu(self, package):
+        self._show_screen(("topics", package), lambda screen: self._build_topic_menu(screen, package), "bank")
 
-        db = normalize_correct_answer(raw) or []
-        print(f"[DEBUG] start_quiz package={pkg!r} raw_count={len(raw)} normalized={len(db)} level={lvl}")
+    def _build_topic_menu(self, screen, package):
+        box = ttk.Frame(screen)
+        box.place(relx=0.5, rely=0.5, anchor="center")
 
-        self.questions = pick_questions_with_fresh_priority(
-            db, QUESTIONS_PER_LEVEL, self.history, pkg, lvl
-        ) or []
+        ttk.Label(box, text=f"Topik {package}", style="Title.TLabel").pack(pady=20)
+        topics = list_topics(package)
+        for topic, count in topics:
+            # small topics get a shorter session instead of an unsatisfiable one
+            n = min(count, self.engine.questions_per_level)
+            ttk.Button(box, text=f"{topic.capitalize()} ({count})", width=40,
+                       command=lambda t=topic, n=n: self.start_custom(package, [{"topic": t, "count": n}], n)
+                       ).pack(pady=4)
+        if len(topics) > 1:
+            # same share for every topic, rest of the session from the whole package
+            mix = [{"topic": t, "share": 1 / len(topics)} for t, _ in topics]
+            ttk.Button(box, text="🎲 Campuran Topik", width=40,
+                       command=lambda: self.start_custom(package, mix)).pack(pady=(12, 4))
+        if not topics:
+            ttk.Label(box, text="Tidak ada topik tersedia", style="Subtitle.TLabel").pack(pady=10)
+
+        ttk.Button(box, text="⬅ Kembali", command=lambda: self._level_menu(package)).pack(pady=20)
 
-        print(f"[DEBUG] start_quiz: selected_count={len(self.questions)} (QUESTIONS_PER_LEVEL={QUESTIONS_PER_LEVEL})")
+    # ================= START QUIZ =================
+    def _drop_session(self):
+        if self.session and not self.session.finished:
+            self.engine.discard(self.session)
+        self.session = None
 
-        if not self.questions:
-            messagebox.showinfo("Info", f"Soal tidak tersedia untuk paket {package} pada level {level}")
+    def start_quiz(self, package, level):
+        self._drop_session()
+        try:
+            if level == "adaptive":
+                self.session = self.engine.start_adaptive(package)
+            elif level == "review":
+                self.session = self.engine.start_review(package)
+            else:
+                self.session = self.engine.start_quiz(package, level)
+        except QuizError as e:
+            messagebox.showinfo("Info", str(e))
+            event("quiz.start_failed", package=package, level=level, error=str(e))
             return
 
-        self.idx = 0
-        self.score = 0
-        self.is_daily = False
+        event("quiz.start", package=self.session.package, level=level, selected=len(self.session.questions))
+        self.start_timer()
+        self.show_question()
+
+    def start_custom(self, package, constraints, total=None):
+        self._drop_session()
+        try:
+            self.session = self.engine.start_custom(constraints, total, package=package)
+        except QuizError as e:
+            messagebox.showinfo("Info", str(e))
+            event("custom.start_failed", package=package, error=str(e))
+            return
+        event("custom.start", package=package, constraints=constraints, selected=len(self.session.questions))
         self.start_timer()
         self.show_question()
 
     # ================= DAILY =================
     def _daily_menu(self):
-        self.clear()
-        box = ttk.Frame(self.container)
+        self._refresh_packages()
+        self._show_screen("daily", self._build_daily_menu, "packages")
+
+    def _build_daily_menu(self, screen):
+        box = ttk.Frame(screen)
         box.place(relx=0.5, rely=0.5, anchor="center")
 
         ttk.Label(box, text="Daily Challenge", style="Title.TLabel").pack(pady=20)
@@ -410,148 +561,143 @@ class QuizApp(tk.Tk):
 
         ttk.Button(box, text="⬅ Kembali", command=self._home).pack(pady=20)
 
+    def _refresh_daily_sets(self):
+        """Precompute the new day's sets for every package, then wait for the next midnight."""
+        self.engine.daily_sets.precompute(self.packages)
+        self._schedule_daily_refresh()
+
+    def _schedule_daily_refresh(self):
+        now = datetime.datetime.now()
+        midnight = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+        self.after(int((midnight - now).total_seconds() * 1000) + 1000, self._refresh_daily_sets)
+
     def start_daily(self, package):
         """
         Daily challenge is a mix of levels with different point weights.
-        Default distribution: hard=1, medium=2, easy=2 (total DAILY_NUM=5).
+        Default distribution: DAILY_MIX hard=1, medium=2, easy=2 (total DAILY_NUM=5).
         If not enough questions in a level, fill from other levels.
+        The set is the same for everyone all day (see engine.QuizEngine.start_daily).
         """
-        pkg = (package or "").strip()
-        self.current_package = pkg
-        self.current_level = None
-
-        raw = load_questions_for_package(pkg)
-        if not raw:
-            messagebox.showinfo("Info", f"Soal tidak tersedia untuk paket: {package}")
-            print(f"[DEBUG] start_daily: package={pkg!r} raw_count=0")
-            return
-
-        db = normalize_correct_answer(raw) or []
-
-        desired = {"hard": 1, "medium": 2, "easy": 2}
-        selected = []
-
-        for lvl, cnt in desired.items():
-            if cnt <= 0:
-                continue
-            part = pick_daily_challenge_by_level(db, pkg, level=lvl, count=cnt)
-            if part:
-                selected.extend(part)
-
-        if len(selected) < DAILY_NUM:
-            selected_ids = {q.get("id") for q in selected if q.get("id")}
-            remaining_pool = [q for q in db if (q.get("question") or q.get("choices") or q.get("reading")) and q.get("id") not in selected_ids]
-            if remaining_pool:
-                random.shuffle(remaining_pool)
-                need = DAILY_NUM - len(selected)
-                selected.extend(remaining_pool[:need])
-
-        if len(selected) < DAILY_NUM:
-            extra = pick_daily_challenge_by_level(db, pkg, level='all', count=DAILY_NUM - len(selected))
-            if extra:
-                selected.extend(extra)
-
-        if not selected:
-            messagebox.showinfo("Info", "Soal daily tidak tersedia")
-            print(f"[DEBUG] start_daily: package={pkg!r} selected_count=0 after fallback")
+        self._drop_session()
+        try:
+            self.session = self.engine.start_daily(package)
+        except QuizError as e:
+            messagebox.showinfo("Info", str(e))
+            event("daily.start_failed", package=package, error=str(e))
             return
 
-        if len(selected) > DAILY_NUM:
-            selected = selected[:DAILY_NUM]
-
-        self.questions = selected
-        print(f"[DEBUG] start_daily package={pkg!r} total_db={len(db)} selected={len(self.questions)}")
-
-        self.idx = 0
-        self.daily_score = 0
-        self.daily_breakdown = {"easy": 0, "medium": 0, "hard": 0}
-        self.is_daily = True
+        event("daily.start", package=self.session.package, selected=len(self.session.questions))
         self.start_timer()
         self.show_question()
 
     # ================= QUESTION =================
-    def show_question(self):
-            self.showing_explanation = False
-            self.clear()
-            
-            
-            self.radio = [] 
+    def _question_view_alive(self):
+        return self.q_main is not None and self.q_main.winfo_exists()
 
-            if not self.questions:
-                messagebox.showinfo("Info", "Tidak ada soal")
-                self._home()
-                return
+    def _build_question_view(self):
+        """Create the question screen once; show_question only updates it."""
+        self.clear()
+        self.radio = []
+        self.radio_rows = []
 
+        main_bg = tk.Frame(self.container, bg="#FDF2F8")
+        main_bg.pack(fill="both", expand=True)
+        self.q_main = main_bg
 
-            main_bg = tk.Frame(self.container, bg="#FDF2F8")
-            main_bg.pack(fill="both", expand=True)
+        flowers = [
+            (0.05, 0.1, "🌸"), (0.95, 0.1, "🌺"),
+            (0.05, 0.9, "🌷"), (0.95, 0.9, "🌸")
+        ]
+        for relx, rely, icon in flowers:
+            tk.Label(main_bg, text=icon, font=("Arial", 40), bg="#FDF2F8", fg="#FBCFE8").place(relx=relx, rely=rely, anchor="center")
 
-            flowers = [
-                (0.05, 0.1, "🌸"), (0.95, 0.1, "🌺"),
-                (0.05, 0.9, "🌷"), (0.95, 0.9, "🌸")
-            ]
-            for relx, rely, icon in flowers:
-                tk.Label(main_bg, text=icon, font=("Arial", 40), bg="#FDF2F8", fg="#FBCFE8").place(relx=relx, rely=rely, anchor="center")
+        tk.Label(main_bg, text="Bloom Study", font=("Georgia", 24, "italic"), bg="#FDF2F8", fg="#8B4C39").pack(pady=(20, 0))
 
-            tk.Label(main_bg, text="Bloom Study", font=("Georgia", 24, "italic"), bg="#FDF2F8", fg="#8B4C39").pack(pady=(20, 0))
+        card_border = tk.Frame(main_bg, bg="#F9A8D4", padx=2, pady=2)
+        card_border.place(relx=0.5, rely=0.48, anchor="center")
 
-            card_border = tk.Frame(main_bg, bg="#F9A8D4", padx=2, pady=2)
-            card_border.place(relx=0.5, rely=0.48, anchor="center")
+        card = tk.Frame(card_border, bg="white", padx=50, pady=40)
+        card.pack()
+        self.q_card = card
 
-            card = tk.Frame(card_border, bg="white", padx=50, pady=40)
-            card.pack()
+        header_frame = tk.Frame(card, bg="white")
+        header_frame.pack(fill="x")
 
-            q = self.questions[self.idx]
+        self.q_progress = tk.Label(header_frame, font=("Georgia", 11), bg="white", fg="#DB7093")
+        self.q_progress.pack(side="left")
 
-            header_frame = tk.Frame(card, bg="white")
-            header_frame.pack(fill="x")
-            
-            tk.Label(header_frame, text=f"✧ Soal {self.idx+1} / {len(self.questions)} ✧", 
-                    font=("Georgia", 11), bg="white", fg="#DB7093").pack(side="left")
-            
-            self.timer_label = tk.Label(header_frame, font=("Segoe UI", 11, "bold"), bg="white", fg="#8B4C39")
-            self.timer_label.pack(side="right")
+        self.timer_label = tk.Label(header_frame, font=("Segoe UI", 11, "bold"), bg="white", fg="#8B4C39")
+        self.timer_label.pack(side="right")
 
-            tk.Frame(card, height=1, width=100, bg="#FCE7F3").pack(pady=10)
+        tk.Frame(card, height=1, width=100, bg="#FCE7F3").pack(pady=10)
 
-            tk.Label(card, text=q.get("question", "-"), font=("Georgia", 15), 
-                    bg="white", fg="#4A044E", wraplength=600, justify="center").pack(pady=20)
+        self.q_text = tk.Label(card, font=("Georgia", 15), bg="white", fg="#4A044E",
+                               wraplength=600, justify="center")
+        self.q_text.pack(pady=20)
 
-            self.answer_var = tk.IntVar(value=-1)
-            
-            for i, c in enumerate(q.get("choices", [])):
-                f = tk.Frame(card, bg="white")
-                f.pack(anchor="w", pady=5, padx=50)
-                
-                rb = ttk.Radiobutton(f, text=c, variable=self.answer_var, value=i, 
-                                    style="Choice.TRadiobutton")
-                rb.pack(side="left")
-                
-                self.radio.append(rb) 
-
-            self.feedback = tk.Label(card, font=("Segoe UI", 12, "bold"), bg="white")
-            self.feedback.pack(pady=5)
-            self.expl = tk.Label(card, font=("Segoe UI", 10), bg="white", wraplength=550, fg="#8B4C39")
-            self.expl.pack()
+        self.answer_var = tk.IntVar(value=-1)
 
-            
-            btn_container = tk.Frame(main_bg, bg="#FDF2F8")
-            btn_container.pack(side="bottom", pady=40)
+        self.feedback = tk.Label(card, font=("Segoe UI", 12, "bold"), bg="white")
+        self.feedback.pack(pady=5)
+        self.expl = tk.Label(card, font=("Segoe UI", 10), bg="white", wraplength=550, fg="#8B4C39")
+        self.expl.pack()
+
+        btn_container = tk.Frame(main_bg, bg="#FDF2F8")
+        btn_container.pack(side="bottom", pady=40)
+
+        tk.Button(btn_container, text="🌸 Next Step", font=("Georgia", 12, "bold"), 
+                bg="#F472B6", fg="white", relief="flat", padx=40, pady=10,
+                command=self.next_step, cursor="hand2").pack(pady=5)
+
+        tk.Button(btn_container, text="⬅ Kembali", font=("Georgia", 11), 
+                bg="#FBCFE8", fg="#8B4C39", relief="flat", padx=35, pady=8,
+                command=self._home, cursor="hand2").pack(pady=5)
+
+    def _set_choices(self, choices):
+        """Reuse the radio button pool: grow it when needed, hide the surplus."""
+        while len(self.radio) < len(choices):
+            f = tk.Frame(self.q_card, bg="white")
+            rb = ttk.Radiobutton(f, variable=self.answer_var, value=len(self.radio),
+                                 style="Choice.TRadiobutton")
+            rb.pack(side="left")
+            self.radio_rows.append(f)
+            self.radio.append(rb)
 
-            tk.Button(btn_container, text="🌸 Next Step", font=("Georgia", 12, "bold"), 
-                    bg="#F472B6", fg="white", relief="flat", padx=40, pady=10,
-                    command=self.next_step, cursor="hand2").pack(pady=5)
+        for i, (f, rb) in enumerate(zip(self.radio_rows, self.radio)):
+            if i < len(choices):
+                rb.config(text=choices[i])
+                rb.state(["!disabled"])
+                if not f.winfo_manager():
+                    f.pack(anchor="w", pady=5, padx=50, before=self.feedback)
+            else:
+                f.pack_forget()
+
+    @traced("screen.show_question")
+    def show_question(self):
+        self.showing_explanation = False
+
+        if not self.session or not self.session.questions:
+            messagebox.showinfo("Info", "Tidak ada soal")
+            self._home()
+            return
+
+        if not self._question_view_alive():
+            self._build_question_view()
+
+        session = self.session
+        q = session.current()
 
-            tk.Button(btn_container, text="⬅ Kembali", font=("Georgia", 11), 
-                    bg="#FBCFE8", fg="#8B4C39", relief="flat", padx=35, pady=8,
-                    command=self._home, cursor="hand2").pack(pady=5)
+        self.q_progress.config(text=f"✧ Soal {session.idx+1} / {len(session.questions)} ✧")
+        self.q_text.config(text=q.get("question", "-"))
+        self.answer_var.set(-1)
+        self._set_choices(q.get("choices", []))
+        self.feedback.config(text="")
+        self.expl.config(text="")
         # ================= NEXT =================
     def next_step(self):
-        if not self.questions:
+        if not self.session:
             return
 
-        q = self.questions[self.idx]
-
         if not self.showing_explanation:
             sel = self.answer_var.get()
             if sel == -1:
@@ -561,26 +707,13 @@ class QuizApp(tk.Tk):
             for rb in self.radio:
                 rb.state(["disabled"])
 
-            if sel == q.get("correct_answer"):
-                if self.is_daily:
-                    lvl = (q.get("level") or "easy").strip().lower()
-                    pts = DAILY_POINTS.get(lvl, 1)
-                    self.daily_score += pts
-                    if lvl not in self.daily_breakdown:
-                        self.daily_breakdown[lvl] = 0
-                    self.daily_breakdown[lvl] += pts
-                else:
-                    self.score += 1
-                self.feedback.config(text="✅ BENAR")
-            else:
-                self.feedback.config(text="❌ SALAH")
-
-            self.expl.config(text=f"Pembahasan:\n{q.get('explanation','-')}")
+            result = self.session.answer(sel)
+            self.feedback.config(text="✅ BENAR" if result["correct"] else "❌ SALAH")
+            self.expl.config(text=f"Pembahasan:\n{result['explanation']}")
             self.showing_explanation = True
             return
 
-        if self.idx < len(self.questions) - 1:
-            self.idx += 1
+        if self.session.advance():
             self.show_question()
         else:
             self.finish()
@@ -590,17 +723,18 @@ class QuizApp(tk.Tk):
         self.clear()
         
         # 1. Simpan Data ke History
-        new_record = {
-            "id": str(uuid.uuid4())[:8],
-            "date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
-            "package": self.current_package,
-            "score": self.score
-            }
-        self.history.append(new_record)
-        save_json(HISTORY_FILE, self.history)
+        session = self.session
+        if session is None:
+            self._home()
+            return
+        self.stop_timer()
+        self.engine.finish(session)
+        self._bump("history")
 
         # 2. Jalankan Animasi Perayaan
-        self.after(300, self.start_canvas_confetti)
+        celebration = tk.Canvas(self.container, bg="#FFF0F5", highlightthickness=0)
+        celebration.pack(fill="both", expand=True)
+        self.start_canvas_confetti(celebration, delay=300)
 
         # 3. Tampilkan Kartu Hasil di Tengah
         result_card = tk.Frame(self.container, bg="white", padx=50, pady=50, 
@@ -610,66 +744,228 @@ class QuizApp(tk.Tk):
         tk.Label(result_card, text="🌸 Quiz Completed! 🌸", font=("Georgia", 18, "italic"), 
                  bg="white", fg="#8B4C39").pack(pady=(0, 10))
         
-        tk.Label(result_card, text=f"Your Score: {self.score}", font=("Georgia", 36, "bold"), 
+        tk.Label(result_card, text=f"Your Score: {session.total_score}", font=("Georgia", 36, "bold"), 
                  bg="white", fg="#DB7093").pack(pady=20)
 
         tk.Button(result_card, text="Back to Home", font=("Georgia", 11), bg="#FFB6C1", 
                   fg="white", relief="flat", padx=20, pady=10, command=self._home).pack()
 
     # ================= HALAMAN RIWAYAT (HISTORY) =================
+    @traced("screen.history")
     def _history(self):
-        self.clear()
-        
+        self._show_screen("history", self._build_history, "history")
 
-        history_frame = tk.Frame(self.container, bg="#FFF0F5", padx=40, pady=30)
+    @traced("screen.history.build")
+    def _build_history(self, screen):
+        history_frame = tk.Frame(screen, bg="#FFF0F5", padx=40, pady=30)
         history_frame.pack(fill="both", expand=True)
 
         tk.Label(history_frame, text="📜 Study History", font=("Georgia", 22, "italic"), 
                  fg="#8B4C39", bg="#FFF0F5").pack(pady=(0, 20))
 
-        header = tk.Frame(history_frame, bg="#FFB6C1")
-        header.pack(fill="x")
-        
-        cols = [("Date & Time", 0.3), ("Subject", 0.3), ("Score", 0.2), ("Status", 0.2)]
-        for txt, width in cols:
-            tk.Label(header, text=txt, font=("Arial", 10, "bold"), bg="#FFB6C1", 
-                     fg="white", pady=8).pack(side="left", expand=True, fill="x")
-
-
-        data_container = tk.Frame(history_frame, bg="white", highlightbackground="#FFB6C1", highlightthickness=1)
-        data_container.pack(fill="both", expand=True, pady=10)
-
-        if not self.history:
-            tk.Label(data_container, text="Belum ada riwayat pengerjaan soal. ✨", 
-                     font=("Arial", 10), bg="white", fg="#DB7093").pack(pady=50)
-        else:
-            for record in reversed(self.history[-10:]):
-                row = tk.Frame(data_container, bg="white")
-                row.pack(fill="x", pady=1)
-                tgl = record.get('date', '-')
-                sub = record.get('package', 'UTBK')
-                skr = record.get('score', 0)
-
-                tk.Label(row, text=tgl, bg="white", font=("Arial", 9)).pack(side="left", expand=True, fill="x")
-                tk.Label(row, text=sub, bg="white", font=("Arial", 9)).pack(side="left", expand=True, fill="x")
-                tk.Label(row, text=skr, bg="white", font=("Arial", 9, "bold"), fg="#DB7093").pack(side="left", expand=True, fill="x")
-                tk.Label(row, text="Completed ✅", bg="white", font=("Arial", 8), fg="#4CAF50").pack(side="left", expand=True, fill="x")
+        # ringkasan per paket (dihitung bertahap oleh engine.stats)
+        summaries = self.engine.stats.summaries()
+        if summaries:
+            stats_tree = ttk.Treeview(history_frame, columns=("pkg", "n", "mean", "best", "trend"),
+                                      show="headings", height=min(len(summaries), 5), style="History.Treeview")
+            for col, txt, w in (("pkg", "Subject", 160), ("n", "Attempts", 90), ("mean", "Mean", 90),
+                                ("best", "Best", 90), ("trend", "Trend", 90)):
+                stats_tree.heading(col, text=txt)
+                stats_tree.column(col, width=w, anchor="center")
+            for st in summaries:
+                trend = st["trend"]
+                arrow = "–" if trend is None else ("▲ %+.1f" % trend if trend > 0 else ("▼ %+.1f" % trend if trend < 0 else "= 0"))
+                name = f"{st['package']} (daily)" if st["daily"] else st["package"]
+                stats_tree.insert("", "end", values=(name, st["attempts"], f"{st['mean']:.1f}",
+                                                    f"{st['best']:g}", arrow))
+            stats_tree.pack(fill="x", pady=(0, 15))
+
+        # satu halaman riwayat saja yang ada di widget
+        self.history_tree = ttk.Treeview(history_frame, columns=("date", "pkg", "score", "status"),
+                                         show="headings", height=HISTORY_PAGE_SIZE, style="History.Treeview")
+        for col, txt in (("date", "Date & Time"), ("pkg", "Subject"), ("score", "Score"), ("status", "Status")):
+            self.history_tree.heading(col, text=txt)
+            self.history_tree.column(col, anchor="center")
+        self.history_tree.pack(fill="both", expand=True, pady=10)
+
+        self.history_empty = tk.Label(history_frame, text="Belum ada riwayat pengerjaan soal. ✨",
+                                      font=("Arial", 10), bg="#FFF0F5", fg="#DB7093")
 
         btn_frame = tk.Frame(history_frame, bg="#FFF0F5")
         btn_frame.pack(pady=10)
 
+        self.history_prev = tk.Button(btn_frame, text="◁ Prev", font=("Arial", 10), bg="white", relief="flat",
+                                      padx=15, command=lambda: self._history_page(self.history_page_no - 1), cursor="hand2")
+        self.history_prev.pack(side="left", padx=5)
+        self.history_page_label = tk.Label(btn_frame, font=("Arial", 10), bg="#FFF0F5", fg="#8B4C39")
+        self.history_page_label.pack(side="left", padx=5)
+        self.history_next = tk.Button(btn_frame, text="Next ▷", font=("Arial", 10), bg="white", relief="flat",
+                                      padx=15, command=lambda: self._history_page(self.history_page_no + 1), cursor="hand2")
+        self.history_next.pack(side="left", padx=5)
+
         tk.Button(btn_frame, text="◁ Back", font=("Arial", 10), bg="white", relief="flat", 
                   padx=20, command=self._home, cursor="hand2").pack(side="left", padx=10)
         
         tk.Button(btn_frame, text="🗑 Clear History", font=("Arial", 10), bg="#FF69B4", fg="white", 
                   relief="flat", padx=20, command=self.clear_history_data, cursor="hand2").pack(side="left", padx=10)
+
+        self._history_page(0)
+
+    def _history_page(self, page):
+        """Swap the rows of the history table for one page of the store."""
+        records, total = self.engine.history_page(max(page, 0) * HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE)
+        pages = max(1, math.ceil(total / HISTORY_PAGE_SIZE))
+        self.history_page_no = min(max(page, 0), pages - 1)
+        if self.history_page_no != page:
+            records, total = self.engine.history_page(self.history_page_no * HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE)
+
+        tree = self.history_tree
+        tree.delete(*tree.get_children())
+        for record in records:
+            tree.insert("", "end", values=(record.get('date', '-'), record.get('package', 'UTBK'),
+                                           record.get('score', 0), "Completed ✅"))
+
+        if total:
+            self.history_empty.pack_forget()
+        else:
+            self.history_empty.pack(before=tree, pady=20)
+        self.history_page_label.config(text=f"Hal. {self.history_page_no + 1} / {pages}")
+        self.history_prev.config(state="normal" if self.history_page_no > 0 else "disabled")
+        self.history_next.config(state="normal" if self.history_page_no < pages - 1 else "disabled")
+
     def clear_history_data(self):
         if messagebox.askyesno("Confirm", "Hapus semua riwayat belajar kamu? ✨"):
-            self.history = [] 
-            save_json(HISTORY_FILE, self.history) 
-            self._history() 
+            self.engine.clear_history()
+            self._bump("history")
+            self._history()
             messagebox.showinfo("Success", "Riwayat berhasil dibersihkan! 🌸")
 
+    # ================= PENCARIAN SOAL =================
+    def _search(self):
+        self.clear()
+
+        frame = tk.Frame(self.container, bg="#FFF0F5", padx=40, pady=30)
+        frame.pack(fill="both", expand=True)
+
+        tk.Label(frame, text="🔍 Cari Soal", font=("Georgia", 22, "italic"),
+                 fg="#8B4C39", bg="#FFF0F5").pack(pady=(0, 20))
+
+        bar = tk.Frame(frame, bg="#FFF0F5")
+        bar.pack(fill="x")
+        self.search_var = tk.StringVar()
+        entry = ttk.Entry(bar, textvariable=self.search_var, font=("Segoe UI", 12))
+        entry.pack(side="left", fill="x", expand=True)
+        self.search_pkg = tk.StringVar(value="Semua paket")
+        ttk.Combobox(bar, textvariable=self.search_pkg, state="readonly", width=18,
+                     values=["Semua paket"] + list(self.packages)).pack(side="left", padx=10)
+
+        self.search_tree = ttk.Treeview(frame, columns=("id", "pkg", "level", "text"),
+                                        show="headings", style="History.Treeview")
+        for col, txt, w in (("id", "ID", 90), ("pkg", "Subject", 120), ("level", "Level", 80), ("text", "Soal", 520)):
+            self.search_tree.heading(col, text=txt)
+            self.search_tree.column(col, width=w, anchor="w" if col == "text" else "center")
+        self.search_tree.pack(fill="both", expand=True, pady=10)
+        self.search_tree.bind("<Double-1>", self._search_open)
+
+        self.search_status = tk.Label(frame, font=("Arial", 10), bg="#FFF0F5", fg="#DB7093")
+        self.search_status.pack()
+        tk.Button(frame, text="◁ Back", font=("Arial", 10), bg="white", relief="flat",
+                  padx=20, command=self._home, cursor="hand2").pack(pady=10)
+
+        self.search_job = None
+        self.search_results = {}
+        # search as the user types, once typing pauses
+        self.search_var.trace_add("write", lambda *_: self._search_schedule())
+        self.search_pkg.trace_add("write", lambda *_: self._search_schedule())
+        entry.focus_set()
+
+    def _search_schedule(self):
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(200, self._search_run)
+
+    def _search_run(self):
+        self.search_job = None
+        if not self.search_tree.winfo_exists():
+            return
+        query = self.search_var.get().strip()
+        pkg = self.search_pkg.get()
+        results = search_questions(query, package=None if pkg == "Semua paket" else pkg,
+                                   limit=SEARCH_LIMIT) if query else []
+        tree = self.search_tree
+        tree.delete(*tree.get_children())
+        self.search_results = {}
+        for q in results:
+            text = " ".join(str(q.question or q.reading or "").split())
+            row = tree.insert("", "end", values=(q.id, q.package, q.level or "-", text[:120]))
+            self.search_results[row] = q
+        if query:
+            self.search_status.config(text=f"{len(results)} hasil" if results else "Tidak ada soal yang cocok")
+        else:
+            self.search_status.config(text="")
+
+    def _search_open(self, _event=None):
+        q = self.search_results.get(self.search_tree.focus())
+        if q is None:
+            return
+        lines = []
+        if q.reading:
+            lines += [q.reading, ""]
+        lines.append(q.question or "")
+        for i, c in enumerate(q.choices):
+            mark = "✔" if i == q.correct_answer else " "
+            lines.append(f"{mark} {chr(65 + i)}. {c}")
+        if q.explanation:
+            lines += ["", f"Pembahasan: {q.explanation}"]
+        messagebox.showinfo(f"{q.id} · {q.package}", "\n".join(lines))
+
+    # ================= DIAGNOSTIK =================
+    def _diagnostics(self):
+        """F12: live widget / after-job counts and span timings (turns tracing on in memory)."""
+        if self.diagnostics is not None and self.diagnostics.winfo_exists():
+            self.diagnostics.lift()
+            return
+        if not tracing.enabled():
+            tracing.enable(export=False)
+
+        win = self.diagnostics = tk.Toplevel(self)
+        win.title("Diagnostics")
+        win.geometry("640x420")
+        self.diag_label = tk.Label(win, font=("Consolas", 10), justify="left", anchor="w")
+        self.diag_label.pack(fill="x", padx=10, pady=8)
+        self.diag_tree = ttk.Treeview(win, columns=("name", "n", "mean", "max", "last"), show="headings")
+        for col, txt, w in (("name", "Span / counter", 240), ("n", "Count", 70), ("mean", "Mean ms", 90),
+                            ("max", "Max ms", 90), ("last", "Last ms", 90)):
+            self.diag_tree.heading(col, text=txt)
+            self.diag_tree.column(col, width=w, anchor="w" if col == "name" else "e")
+        self.diag_tree.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        self._diagnostics_refresh()
+
+    def _count_widgets(self, widget):
+        n = 1
+        for child in widget.winfo_children():
+            n += self._count_widgets(child)
+        return n
+
+    def _diagnostics_refresh(self):
+        win = self.diagnostics
+        if win is None or not win.winfo_exists():
+            self.diagnostics = None
+            return
+        jobs = self.tk.splitlist(self.tk.call("after", "info"))
+        # the panel's own widgets are left out of the count
+        self.diag_label.config(text=f"Widgets: {self._count_widgets(self) - self._count_widgets(win)}    "
+                                    f"Pending after jobs: {len(jobs)}")
+        snap = tracing.snapshot()
+        tree = self.diag_tree
+        tree.delete(*tree.get_children())
+        for name, st in sorted(snap["spans"].items()):
+            tree.insert("", "end", values=(name, st["count"], f"{st['mean_ms']:.2f}",
+                                           f"{st['max_ms']:.2f}", f"{st['last_ms']:.2f}"))
+        for name, n in sorted(snap["counters"].items()):
+            tree.insert("", "end", values=(name, n, "", "", ""))
+        win.after(DIAGNOSTICS_MS, self._diagnostics_refresh)
+
 # ================= MENJALANKAN APLIKASI =================
 if __name__ == "__main__":
     try:
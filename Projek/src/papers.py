@@ -0,0 +1,202 @@
+"""
+Generate many distinct, balanced exam papers from the bank.
+
+  python papers.py 500 --package pk --per-level easy=4,medium=4,hard=2 \
+      --max-overlap 3 --seed 42 -o tryout/
+
+  python papers.py 200 --stratum level=hard,topic=matematika,count=2 --total 10 -o tryout/
+
+Strata use the same constraints as the session builder (utils.build_session):
+--per-level / --per-topic are shorthands for one stratum per level or
+topic, --stratum takes any package/level/topic filter with a count, and
+the rest of --total (default: the sum of the strata) is filled from the
+package. Strata are drawn as disjoint sets, so level-only and topic-only
+strata cannot be combined (a topic's questions would be of any level);
+give each level/topic cell as its own --stratum instead.
+
+Paper k, attempt a is drawn from random.Random(seed, k, a), so the output
+depends only on the arguments, not on the number of worker processes.
+Candidates are drawn in parallel on a ProcessPoolExecutor; a sequential
+acceptance pass then keeps each paper only if it shares at most
+--max-overlap questions with every paper accepted before it, and rejected
+papers are redrawn with the next attempt number.
+
+Output (in -o):
+  papers.jsonl   {"paper": k, "ids": [...]} per line
+  keys.csv       paper,key  with the answer letters in paper order
+"""
+import os
+import sys
+import csv
+import json
+import random
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import build_session, load_index, ConstraintError, _stable_seed
+
+MAX_ATTEMPTS = 50
+CHUNK = 64
+
+def _draw(job):
+    """Worker: ids of one candidate paper. job = (seed, paper, attempt, total, strata, package)."""
+    seed, paper, attempt, total, strata, package = job
+    rng = random.Random(_stable_seed("paper", seed, paper, attempt))
+    return paper, attempt, [q.id for q in build_session(total, strata, package, rng=rng)]
+
+class _Drawer:
+    """Runs draw jobs in-process for small batches, on one shared process pool otherwise."""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.pool = None
+
+    def __call__(self, jobs):
+        if self.workers == 1 or len(jobs) < 2 * CHUNK:
+            return [_draw(job) for job in jobs]
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return list(self.pool.map(_draw, jobs, chunksize=CHUNK))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+def generate_papers(count, strata=(), total=None, package=None, seed=0, max_overlap=None,
+                    workers=None, max_attempts=MAX_ATTEMPTS):
+    """
+    Return `count` papers, each a list of question ids.
+    max_overlap: most questions any two papers may share (None = no limit).
+    Raises ConstraintError when the strata cannot be met, mix level-only
+    with topic-only strata, or a paper still overlaps too much after
+    max_attempts draws.
+    """
+    strata = [dict(s) for s in strata]
+    if any(s.get('level') and not s.get('topic') for s in strata) and \
+            any(s.get('topic') and not s.get('level') for s in strata):
+        raise ConstraintError("--per-level tidak bisa digabung dengan --per-topic; "
+                              "gunakan --stratum level=..,topic=..,count=N per kombinasi")
+    if total is None:
+        total = sum(int(s.get('count', 0)) for s in strata)
+    if total <= 0:
+        raise ConstraintError("Jumlah soal per paket ujian harus lebih dari 0")
+    # load once here so forked workers share the parsed bank, and fail fast on bad strata
+    load_index()
+    _draw((seed, 0, 0, total, strata, package))
+
+    papers = [None] * count
+    holders = {}  # question id -> accepted papers containing it
+    pending = list(range(count))
+    attempt = 0
+    draw = _Drawer(workers)
+    try:
+        while pending:
+            if attempt >= max_attempts:
+                raise ConstraintError(
+                    f"{len(pending)} paket ujian masih berbagi lebih dari {max_overlap} soal "
+                    f"setelah {max_attempts} percobaan (mis. paket {pending[0] + 1})")
+            jobs = [(seed, k, attempt, total, strata, package) for k in pending]
+            rejected = []
+            for paper, _attempt, ids in draw(jobs):
+                if max_overlap is not None:
+                    shared = Counter(other for qid in ids for other in holders.get(qid, ()))
+                    if shared and max(shared.values()) > max_overlap:
+                        rejected.append(paper)
+                        continue
+                papers[paper] = ids
+                for qid in ids:
+                    holders.setdefault(qid, []).append(paper)
+            pending = rejected
+            attempt += 1
+    finally:
+        draw.close()
+    return papers
+
+def answer_key(ids, index=None):
+    """Answer letters of a paper, '?' where the bank has no resolved answer."""
+    index = index or load_index()
+    out = []
+    for qid in ids:
+        q = index.by_id.get(qid)
+        ca = q.correct_answer if q is not None else None
+        out.append(chr(65 + ca) if isinstance(ca, int) else '?')
+    return "".join(out)
+
+def write_papers(papers, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    index = load_index()
+    with open(os.path.join(out_dir, 'papers.jsonl'), 'w', encoding='utf-8') as f:
+        for k, ids in enumerate(papers, 1):
+            f.write(json.dumps({"paper": k, "ids": ids}, ensure_ascii=False, separators=(',', ':')) + "\n")
+    with open(os.path.join(out_dir, 'keys.csv'), 'w', encoding='utf-8', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(["paper", "key"])
+        for k, ids in enumerate(papers, 1):
+            w.writerow([k, answer_key(ids, index)])
+
+def overlap_stats(papers):
+    """(max, mean) questions shared by a pair of papers."""
+    holders = {}
+    for k, ids in enumerate(papers):
+        for qid in ids:
+            holders.setdefault(qid, []).append(k)
+    pairs = Counter()
+    for ks in holders.values():
+        for i, a in enumerate(ks):
+            for b in ks[i + 1:]:
+                pairs[(a, b)] += 1
+    n = len(papers) * (len(papers) - 1) // 2
+    return (max(pairs.values()) if pairs else 0), (sum(pairs.values()) / n if n else 0.0)
+
+# ================= CLI =================
+def _pairs(text, key):
+    """'easy=4,hard=2' -> [{key: 'easy', 'count': 4}, ...]"""
+    out = []
+    for part in filter(None, (p.strip() for p in (text or "").split(","))):
+        name, _, n = part.partition("=")
+        out.append({key: name.strip(), "count": int(n)})
+    return out
+
+def _stratum(text):
+    """'level=hard,topic=matematika,count=2' -> dict"""
+    spec = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        k, _, v = part.partition("=")
+        k = k.strip()
+        if k not in ("package", "level", "topic", "count", "share"):
+            raise argparse.ArgumentTypeError(f"unknown stratum key {k!r}")
+        spec[k] = int(v) if k == "count" else (float(v) if k == "share" else v.strip())
+    return spec
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate exam papers and answer keys")
+    ap.add_argument("count", type=int, help="number of papers")
+    ap.add_argument("--package", help="package the papers are drawn from (default: whole bank)")
+    ap.add_argument("--per-level", help="e.g. easy=4,medium=4,hard=2")
+    ap.add_argument("--per-topic", help="e.g. matematika=5")
+    ap.add_argument("--stratum", action="append", type=_stratum, default=[],
+                    help="package=..,level=..,topic=..,count=N (repeatable)")
+    ap.add_argument("--total", type=int, help="questions per paper (default: sum of the strata)")
+    ap.add_argument("--max-overlap", type=int, help="most questions two papers may share")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    ap.add_argument("-o", "--out", default="papers", help="output directory")
+    args = ap.parse_args(argv)
+
+    strata = _pairs(args.per_level, "level") + _pairs(args.per_topic, "topic") + args.stratum
+    try:
+        papers = generate_papers(args.count, strata, args.total, args.package, args.seed,
+                                 args.max_overlap, args.workers)
+    except ConstraintError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    write_papers(papers, args.out)
+    worst, mean = overlap_stats(papers) if len(papers) <= 1000 else (None, None)
+    print(f"{len(papers)} paket ujian -> {args.out}"
+          + (f" (overlap maks {worst}, rata-rata {mean:.2f})" if worst is not None else ""))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import os
+import heapq
+import datetime
+import time
+
+from utils import DATA_DIR, STORAGE_BACKEND, load_index, _norm_pkg_name
+from history_store import HistoryStore
+
+REVIEW_LOG = os.path.join(DATA_DIR, 'review.jsonl')
+DAY = 24 * 60 * 60
+BOOTSTRAPPED = {'bootstrap': 1}  # log row: the schedule was already built from the history
+
+def open_review_store():
+    """Review log for the configured STORAGE_BACKEND, kept next to the history."""
+    if STORAGE_BACKEND == 'sqlite':
+        from sqlite_store import SQLiteReviewStore
+        return SQLiteReviewStore().open()
+    return HistoryStore(REVIEW_LOG, legacy_path=None).open()
+
+class ReviewItem:
+    __slots__ = ('qid', 'user', 'package', 'ef', 'interval', 'reps', 'due')
+
+    def __init__(self, qid, user, package, ef=2.5, interval=0, reps=0, due=0.0):
+        self.qid = qid
+        self.user = user
+        self.package = package
+        self.ef = ef
+        self.interval = interval
+        self.reps = reps
+        self.due = due
+
+    def to_dict(self):
+        return {'q': self.qid, 'u': self.user, 'p': self.package, 'ef': round(self.ef, 3),
+                'iv': self.interval, 'n': self.reps, 'due': self.due}
+
+def _quality(correct, seconds=None):
+    """SM-2 grade 0..5 from a single outcome."""
+    if not correct:
+        return 1
+    if seconds is not None and seconds > 120:
+        return 3
+    return 5
+
+def _record_time(rec):
+    try:
+        return datetime.datetime.strptime(rec.get('date', ''), "%Y-%m-%d %H:%M").timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+class ReviewScheduler:
+    """
+    SM-2 style review schedule of previously wrong questions.
+    - a question enters the schedule the first time it is answered wrong
+    - each later answer updates its easiness factor, interval and due time
+    - one heap per user and package keyed by due time, so due(k) costs
+      O(k log n) instead of a scan; outdated heap entries are skipped lazily
+      and the heaps are rebuilt once they far outnumber the items
+    - every change is appended to `store`, any store with the history
+      store interface (default: open_review_store())
+    """
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else open_review_store()
+        self.items = {}
+        self.heaps = {}
+        self._log_lines = 0
+        self._heap_entries = 0
+        self.store.open()
+        for row in self.store.iter_records():
+            self._log_lines += 1
+            if row.get('q') is None:
+                continue
+            self._put(ReviewItem(row.get('q'), row.get('u'), row.get('p') or '',
+                                 row.get('ef', 2.5), row.get('iv', 0), row.get('n', 0), row.get('due', 0.0)))
+        # nothing logged yet: the engine builds the schedule from the history once
+        self.fresh = self._log_lines == 0
+
+    def _put(self, item):
+        self.items[(item.user, item.qid)] = item
+        heaps = self.heaps.setdefault(item.user, {})
+        heapq.heappush(heaps.setdefault(item.package, []), (item.due, item.qid))
+        self._heap_entries += 1
+        if self._heap_entries > 4 * max(len(self.items), 256):
+            self._rebuild_heaps()
+
+    def _rebuild_heaps(self):
+        """One heap entry per item, dropping every outdated one."""
+        self.heaps = {}
+        for item in self.items.values():
+            self.heaps.setdefault(item.user, {}).setdefault(item.package, []).append((item.due, item.qid))
+        for heaps in self.heaps.values():
+            for heap in heaps.values():
+                heapq.heapify(heap)
+        self._heap_entries = len(self.items)
+
+    def _update(self, user, qid, package, correct, seconds, now):
+        item = self.items.get((user, qid))
+        if item is None:
+            if correct:
+                return None
+            item = ReviewItem(qid, user, package)
+        q = _quality(correct, seconds)
+        if q < 3:
+            item.reps = 0
+            item.interval = 1
+        else:
+            item.reps += 1
+            item.interval = 1 if item.reps == 1 else (6 if item.reps == 2 else round(item.interval * item.ef))
+        item.ef = max(1.3, item.ef + 0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
+        item.due = now + item.interval * DAY
+        self._put(item)
+        return item
+
+    def add_record(self, rec, persist=True, now=None):
+        """Feed one finished session's outcomes into the schedule."""
+        index = load_index()
+        user = rec.get('user')
+        if now is None:
+            # replayed history is scheduled from the session's own date
+            now = time.time() if persist else _record_time(rec)
+        changed = []
+        for out in rec.get('outcomes') or []:
+            qid = out.get('id')
+            q = index.by_id.get(qid)
+            package = _norm_pkg_name(q.get('package') if q is not None else rec.get('package'))
+            item = self._update(user, qid, package, out.get('correct'), out.get('seconds'), now)
+            if item is not None:
+                changed.append(item.to_dict())
+        if persist and changed:
+            self.store.append_many(changed)
+            self._log_lines += len(changed)
+            if self._log_lines > 4 * max(len(self.items), 256):
+                self.compact()
+
+    def compact(self):
+        self.store.compact([BOOTSTRAPPED] + [it.to_dict() for it in self.items.values()])
+        self._log_lines = len(self.items) + 1
+        self._rebuild_heaps()
+
+    def due(self, user=None, package=None, k=8, now=None):
+        """Up to k items due by `now`, earliest first."""
+        now = time.time() if now is None else now
+        heaps = self.heaps.get(user, {})
+        if package is None:
+            keys = list(heaps)
+        else:
+            keys = [p for p in (_norm_pkg_name(package),) if p in heaps]
+        out = []
+        taken = set()
+        popped = []
+        while len(out) < k:
+            best = None
+            for key in keys:
+                heap = heaps[key]
+                # drop entries made stale by a later update
+                while heap and self.items.get((user, heap[0][1])) is not None and \
+                        self.items[(user, heap[0][1])].due != heap[0][0]:
+                    heapq.heappop(heap)
+                    self._heap_entries -= 1
+                if heap and heap[0][0] <= now and (best is None or heap[0][0] < heaps[best][0][0]):
+                    best = key
+            if best is None:
+                break
+            entry = heapq.heappop(heaps[best])
+            popped.append((best, entry))
+            if entry[1] not in taken:
+                taken.add(entry[1])
+                out.append(self.items[(user, entry[1])])
+        for key, entry in popped:
+            heapq.heappush(heaps[key], entry)
+        return out
+
+    def clear(self):
+        self.items = {}
+        self.heaps = {}
+        self.store.clear()
+        self._log_lines = 0
+        self._heap_entries = 0
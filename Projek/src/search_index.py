@@ -0,0 +1,203 @@
+"""
+Full-text search over the question bank.
+
+An inverted index over question, choices, explanation and reading, ranked
+with BM25. It is built once per bank version and cached in
+data/search.json; later runs load the postings instead of re-tokenizing
+the whole bank.
+
+Tokenization is tuned for Indonesian: lowercase words, common stopwords
+dropped, and a light stemmer that strips particles (-lah, -kah, -pun),
+possessives (-nya, -ku, -mu), one derivational prefix (me-, di-, ber-,
+ter-, pe-, ke-, se-, ...) and the suffixes -kan / -an.
+"""
+import os
+import re
+import json
+import math
+import heapq
+import bisect
+import threading
+
+from utils import DATA_DIR, get_bank, ensure_dirs, _norm_pkg_name
+
+SEARCH_CACHE = os.path.join(DATA_DIR, 'search.json')
+FORMAT = 1
+K1 = 1.2
+B = 0.75
+FIELD_WEIGHTS = {'question': 2, 'choices': 1, 'explanation': 1, 'reading': 1}
+
+# ================= TOKENIZER =================
+STOPWORDS = frozenset("""
+    ada adalah agar akan aku anda apa apakah atau bagaimana bahwa banyak
+    beberapa belum bisa dalam dan dapat dari dengan di dia harus hingga ia
+    ini itu jadi jika juga kami kamu karena ke kita lain lebih mana masih
+    mereka namun oleh pada para saat sangat saja sebagai sebuah secara
+    sedang sehingga sejak seperti serta setelah sudah tanpa telah tentang
+    tersebut tetapi untuk yaitu yakni yang
+""".split())
+
+_WORD = re.compile(r"[0-9a-z]+")
+_PARTICLES = ('lah', 'kah', 'tah', 'pun')
+_POSSESSIVES = ('nya', 'ku', 'mu')
+_PREFIXES = ('meng', 'meny', 'mem', 'men', 'me', 'peng', 'peny', 'pem', 'pen',
+             'per', 'pe', 'ber', 'be', 'ter', 'di', 'ke', 'se')
+_SUFFIXES = ('kan', 'an')
+_MIN_STEM = 4
+
+def _strip_suffix(word, suffixes):
+    for suf in suffixes:
+        if word.endswith(suf) and len(word) - len(suf) >= _MIN_STEM:
+            return word[:-len(suf)]
+    return word
+
+def stem(word):
+    if len(word) <= _MIN_STEM or not word.isalpha():
+        return word
+    word = _strip_suffix(word, _PARTICLES)
+    word = _strip_suffix(word, _POSSESSIVES)
+    for pre in _PREFIXES:
+        if word.startswith(pre):
+            # menyapu -> sapu, penyanyi -> sanyi
+            rest = 's' + word[len(pre):] if pre in ('meny', 'peny') else word[len(pre):]
+            if len(rest) >= _MIN_STEM:
+                word = rest
+            break
+    return _strip_suffix(word, _SUFFIXES)
+
+def tokenize(text):
+    return [stem(w) for w in _WORD.findall(str(text or '').lower()) if w not in STOPWORDS]
+
+# ================= INDEX =================
+class SearchIndex:
+    """
+    Postings are flat lists [doc, tf, doc, tf, ...] per term; doc is the
+    question's position in bank.items(). Field weights are folded into tf.
+    """
+
+    def __init__(self, key, items, docs, lengths, postings):
+        self.key = key
+        self.items = items
+        self.docs = docs
+        self.lengths = lengths
+        self.postings = postings
+        self.terms = sorted(postings)
+        self.avgdl = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    @classmethod
+    def build(cls, key, items):
+        docs = []
+        lengths = []
+        postings = {}
+        for pos, q in enumerate(items):
+            if not q.playable:
+                continue
+            doc = len(docs)
+            tf = {}
+            for field, text in q.text_fields().items():
+                weight = FIELD_WEIGHTS[field]
+                parts = text if isinstance(text, (list, tuple)) else (text,)
+                for part in parts:
+                    for tok in tokenize(part):
+                        tf[tok] = tf.get(tok, 0) + weight
+            docs.append(pos)
+            lengths.append(sum(tf.values()))
+            for tok, n in tf.items():
+                plist = postings.get(tok)
+                if plist is None:
+                    plist = postings[tok] = []
+                plist.append(doc)
+                plist.append(n)
+        return cls(key, items, docs, lengths, postings)
+
+    # ----------------- disk cache -----------------
+    def save(self, path=SEARCH_CACHE):
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'format': FORMAT, 'key': self.key, 'docs': self.docs,
+                       'lengths': self.lengths, 'postings': self.postings},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, key, items, path=SEARCH_CACHE):
+        """The cached index for `key`, or None when missing or built for another bank version."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get('format') != FORMAT or data.get('key') != key:
+            return None
+        docs = data.get('docs') or []
+        if docs and docs[-1] >= len(items):
+            return None
+        return cls(key, items, docs, data.get('lengths') or [], data.get('postings') or {})
+
+    # ----------------- query -----------------
+    def _expand(self, tok):
+        """The term itself, or the indexed terms starting with it when it has no postings."""
+        if tok in self.postings:
+            return [tok]
+        i = bisect.bisect_left(self.terms, tok)
+        out = []
+        while i < len(self.terms) and self.terms[i].startswith(tok) and len(out) < 50:
+            out.append(self.terms[i])
+            i += 1
+        return out
+
+    def search(self, query, package=None, limit=20):
+        toks = tokenize(query)
+        if not toks or not self.docs:
+            return []
+        allowed = None
+        if package:
+            allowed = {p.name for p in get_bank().index().match(package)}
+        n = len(self.docs)
+        scores = {}
+        for tok in dict.fromkeys(toks):
+            for term in self._expand(tok):
+                plist = self.postings[term]
+                df = len(plist) // 2
+                idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+                for i in range(0, len(plist), 2):
+                    doc, tf = plist[i], plist[i + 1]
+                    norm = K1 * (1.0 - B + B * self.lengths[doc] / self.avgdl)
+                    scores[doc] = scores.get(doc, 0.0) + idf * tf * (K1 + 1.0) / (tf + norm)
+        out = []
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0])) if allowed is not None \
+            else heapq.nsmallest(limit, scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        for doc, _score in ranked:
+            q = self.items[self.docs[doc]]
+            if allowed is not None and _norm_pkg_name(q.package) not in allowed:
+                continue
+            out.append(q)
+            if len(out) >= limit:
+                break
+        return out
+
+_INDEX = None
+_LOCK = threading.Lock()
+
+def get_search_index():
+    """The index for the current bank version: in memory, else from the disk cache, else built."""
+    global _INDEX
+    bank = get_bank()
+    key = bank.version()
+    idx = _INDEX
+    if idx is not None and idx.key == key:
+        return idx
+    with _LOCK:
+        if _INDEX is not None and _INDEX.key == key:
+            return _INDEX
+        items = bank.items()
+        idx = SearchIndex.load(key, items)
+        if idx is None:
+            idx = SearchIndex.build(key, items)
+            try:
+                ensure_dirs()
+                idx.save()
+            except OSError:
+                pass
+        _INDEX = idx
+        return idx
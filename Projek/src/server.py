@@ -0,0 +1,437 @@
+"""
+Local multi-user quiz server (asyncio, standard library only).
+
+Run:  python server.py --port 8765
+
+HTTP (JSON bodies and responses):
+  GET  /packages
+  POST /sessions                {"user", "package", "level"}, plus "daily", "adaptive" or "review": true,
+                                or "constraints": [{"topic", "level", "package", "share"|"count"}] and "count"
+  GET  /sessions/<id>
+  POST /sessions/<id>/answer    {"choice": <index>}
+  POST /sessions/<id>/next
+  POST /sessions/<id>/finish
+  GET  /history?user=<user>
+
+WebSocket at /ws: send {"op": "start"|"answer"|"next"|"finish"|"state"|"history", ...}
+with the same fields as the HTTP calls ("session" carries the session id).
+"""
+import argparse
+import asyncio
+import base64
+import collections
+import hashlib
+import json
+import struct
+import traceback
+from urllib.parse import urlsplit, parse_qs
+
+from utils import list_packages_from_soal
+from history_store import open_history_store
+from engine import QuizEngine, QuizError
+from review import ReviewScheduler, open_review_store
+
+RECENT_PER_USER = 50
+FLUSH_INTERVAL = 0.5
+MAX_MESSAGE = 1 << 20  # largest HTTP body / WebSocket frame accepted
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# ================= STORAGE =================
+class BatchedStore:
+    """
+    Wraps a history store and turns append() and compact() into queued
+    writes. Queued records are written with one append_many (one fsync)
+    per flush, off the event loop thread.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self._pending = []
+        self._compact = None
+
+    def open(self):
+        self.inner.open()
+        return self
+
+    def iter_records(self):
+        return self.inner.iter_records()
+
+    def append(self, record):
+        self._pending.append(record)
+
+    def append_many(self, records):
+        self._pending.extend(records)
+
+    def compact(self, records=None):
+        # the rewrite supersedes anything still queued
+        if records is not None:
+            self._compact = list(records)
+            self._pending = []
+
+    async def flush(self):
+        """Write what is queued; on failure the unwritten part is queued again and the error re-raised."""
+        compact, self._compact = self._compact, None
+        batch, self._pending = self._pending, []
+        loop = asyncio.get_running_loop()
+        try:
+            if compact is not None:
+                await loop.run_in_executor(None, self.inner.compact, compact)
+                compact = None
+            if batch:
+                await loop.run_in_executor(None, self.inner.append_many, batch)
+        except BaseException:
+            # a compact queued meanwhile supersedes both
+            if self._compact is None:
+                self._compact = compact
+                self._pending[:0] = batch
+            raise
+
+    def clear(self):
+        self._pending = []
+        self._compact = None
+        self.inner.clear()
+
+# ================= SERVICE =================
+def question_view(session):
+    q = session.current()
+    if q is None:
+        return None
+    return {
+        "index": session.idx,
+        "total": len(session.questions),
+        "id": q.get("id"),
+        "package": q.get("package"),
+        "level": q.get("level"),
+        "topic": q.get("topic"),
+        "reading": q.get("reading"),
+        "question": q.get("question"),
+        "choices": list(q.get("choices", [])),
+    }
+
+class QuizService:
+    """Request handling shared by the HTTP and WebSocket front ends."""
+
+    def __init__(self, store, review_store=None):
+        self.store = BatchedStore(store)
+        self.review_store = BatchedStore(review_store if review_store is not None else open_review_store())
+        self.recent = collections.defaultdict(lambda: collections.deque(maxlen=RECENT_PER_USER))
+        self.engine = QuizEngine(self.store, history=self._replay(), review=ReviewScheduler(self.review_store))
+        self.timers = {}
+
+    def _replay(self):
+        for rec in self.store.iter_records():
+            self.recent[rec.get("user")].append(rec)
+            yield rec
+
+    # ----------------- timers -----------------
+    def _arm(self, session):
+        loop = asyncio.get_running_loop()
+        self.timers[session.id] = loop.call_later(session.remaining(), self._expire, session.id)
+
+    def _expire(self, sid):
+        session = self.engine.get(sid)
+        if session is not None:
+            self._finish(session)
+
+    def _finish(self, session):
+        handle = self.timers.pop(session.id, None)
+        if handle is not None:
+            handle.cancel()
+        rec = self.engine.finish(session)
+        if rec:
+            self.recent[session.user].append(rec)
+        return rec
+
+    def _session(self, sid):
+        if not isinstance(sid, str):
+            raise QuizError("session harus berupa teks")
+        session = self.engine.get(sid)
+        if session is None:
+            raise QuizError("Sesi tidak ditemukan")
+        return session
+
+    def _state(self, session):
+        return {
+            "session": session.id,
+            "package": session.package,
+            "level": session.level,
+            "daily": session.daily,
+            "score": session.total_score,
+            "remaining": int(session.remaining()),
+            "answered": session.answered,
+            "question": question_view(session),
+        }
+
+    # ----------------- operations -----------------
+    def packages(self, msg):
+        return {"packages": list_packages_from_soal()}
+
+    def start(self, msg):
+        user = msg.get("user")
+        if msg.get("daily"):
+            session = self.engine.start_daily(msg.get("package"), user=user)
+        elif msg.get("review"):
+            session = self.engine.start_review(msg.get("package"), user=user)
+        elif msg.get("constraints") is not None:
+            constraints = msg.get("constraints")
+            if not isinstance(constraints, list) or not all(isinstance(c, dict) for c in constraints):
+                raise QuizError("constraints harus berupa daftar objek")
+            for c in constraints:
+                for key in ("package", "level", "topic"):
+                    if c.get(key) is not None and not isinstance(c[key], str):
+                        raise QuizError(f"constraints.{key} harus berupa teks")
+                for key in ("count", "share"):
+                    if c.get(key) is not None and (isinstance(c[key], bool) or not isinstance(c[key], (int, float))):
+                        raise QuizError(f"constraints.{key} harus berupa angka")
+            try:
+                total = int(msg["count"]) if msg.get("count") is not None else None
+            except (TypeError, ValueError, OverflowError):
+                raise QuizError("count harus berupa angka")
+            session = self.engine.start_custom(constraints, total, msg.get("package"), user=user)
+        elif msg.get("adaptive"):
+            session = self.engine.start_adaptive(msg.get("package"), msg.get("level") or "all", user=user)
+        else:
+            session = self.engine.start_quiz(msg.get("package"), msg.get("level"), user=user)
+        self._arm(session)
+        return self._state(session)
+
+    def state(self, msg):
+        return self._state(self._session(msg.get("session")))
+
+    def answer(self, msg):
+        session = self._session(msg.get("session"))
+        try:
+            choice = int(msg.get("choice"))
+        except (TypeError, ValueError):
+            raise QuizError("choice harus berupa angka")
+        return dict(self.engine.answer(session, choice), score=session.total_score)
+
+    def next(self, msg):
+        session = self._session(msg.get("session"))
+        if session.advance():
+            return self._state(session)
+        return {"finished": True, "record": self._finish(session)}
+
+    def finish(self, msg):
+        return {"finished": True, "record": self._finish(self._session(msg.get("session")))}
+
+    def history(self, msg):
+        return {"history": list(self.recent.get(msg.get("user"), ()))}
+
+    OPS = ("packages", "start", "state", "answer", "next", "finish", "history")
+
+    def dispatch(self, op, msg):
+        if not isinstance(op, str) or op not in self.OPS:
+            raise QuizError(f"operasi tidak dikenal: {op}")
+        for key in ("user", "package", "level"):
+            if msg.get(key) is not None and not isinstance(msg[key], str):
+                raise QuizError(f"{key} harus berupa teks")
+        return getattr(self, op)(msg)
+
+    async def flush(self):
+        await self.store.flush()
+        await self.review_store.flush()
+
+    async def flush_loop(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception:
+                traceback.print_exc()  # retried on the next tick
+
+# ================= HTTP =================
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+           500: "Internal Server Error", 101: "Switching Protocols"}
+
+def _route(method, path):
+    parts = [p for p in path.split("/") if p]
+    if method == "GET" and parts == ["packages"]:
+        return "packages", {}
+    if method == "GET" and parts == ["history"]:
+        return "history", {}
+    if method == "POST" and parts == ["sessions"]:
+        return "start", {}
+    if len(parts) == 2 and parts[0] == "sessions" and method == "GET":
+        return "state", {"session": parts[1]}
+    if len(parts) == 3 and parts[0] == "sessions" and method == "POST" and parts[2] in ("answer", "next", "finish"):
+        return parts[2], {"session": parts[1]}
+    return None, {}
+
+def _response(status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+class MessageTooLarge(ValueError):
+    """A client announced a body or frame longer than MAX_MESSAGE."""
+
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, version = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b"\n", b""):
+            break
+        k, _, v = h.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+    length = int(headers.get("content-length") or 0)
+    if length < 0 or length > MAX_MESSAGE:
+        raise MessageTooLarge(length)
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, version.strip(), headers, body
+
+class QuizServer:
+    def __init__(self, service, host="127.0.0.1", port=8765):
+        self.service = service
+        self.host = host
+        self.port = port
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    req = await _read_request(reader)
+                except MessageTooLarge:
+                    writer.write(_response(413, {"error": "request too large"}, keep_alive=False))
+                    break
+                except (ValueError, asyncio.IncompleteReadError):
+                    writer.write(_response(400, {"error": "bad request"}, keep_alive=False))
+                    break
+                if req is None:
+                    break
+                method, target, version, headers, body = req
+                url = urlsplit(target)
+                if url.path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._websocket(reader, writer, headers)
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                writer.write(self._http(method, url, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _http(self, method, url, body, keep_alive):
+        op, params = _route(method, url.path)
+        if op is None:
+            return _response(404, {"error": "not found"}, keep_alive)
+        try:
+            msg = json.loads(body.decode("utf-8")) if body else {}
+            if not isinstance(msg, dict):
+                raise ValueError("body must be a JSON object")
+        except ValueError as e:
+            return _response(400, {"error": str(e)}, keep_alive)
+        msg.update({k: v[0] for k, v in parse_qs(url.query).items()})
+        msg.update(params)
+        try:
+            return _response(200, self.service.dispatch(op, msg), keep_alive)
+        except QuizError as e:
+            return _response(400, {"error": str(e)}, keep_alive)
+        except Exception:
+            traceback.print_exc()
+            return _response(500, {"error": "internal error"}, keep_alive)
+
+    # ----------------- websocket -----------------
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("latin-1")).digest()).decode("ascii")
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode("latin-1"))
+        await writer.drain()
+        while True:
+            try:
+                frame = await _ws_read(reader)
+            except MessageTooLarge:
+                writer.write(_ws_frame(struct.pack("!H", 1009), 0x8))
+                break
+            if frame is None:
+                break
+            opcode, data = frame
+            if opcode == 0x8:
+                writer.write(_ws_frame(b"", 0x8))
+                break
+            if opcode == 0x9:
+                writer.write(_ws_frame(data, 0xA))
+                continue
+            if opcode != 0x1:
+                continue
+            try:
+                msg = json.loads(data.decode("utf-8"))
+                if not isinstance(msg, dict):
+                    raise ValueError("message must be a JSON object")
+                reply = self.service.dispatch(msg.get("op"), msg)
+            except (ValueError, QuizError) as e:
+                reply = {"error": str(e)}
+            except Exception:
+                traceback.print_exc()
+                reply = {"error": "internal error"}
+            writer.write(_ws_frame(json.dumps(reply, ensure_ascii=False).encode("utf-8")))
+            await writer.drain()
+
+    async def serve(self):
+        flusher = asyncio.create_task(self.service.flush_loop())
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        print(f"Quiz server on http://{self.host}:{self.port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            flusher.cancel()
+            await self.service.flush()
+
+async def _ws_read(reader):
+    """Read one client frame; returns (opcode, payload) or None on EOF."""
+    try:
+        b1, b2 = await reader.readexactly(2)
+        length = b2 & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if length > MAX_MESSAGE:
+            raise MessageTooLarge(length)
+        mask = await reader.readexactly(4) if b2 & 0x80 else b"\0\0\0\0"
+        data = await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        return None
+    data = bytes(c ^ mask[i % 4] for i, c in enumerate(data))
+    return b1 & 0x0F, data
+
+def _ws_frame(data, opcode=0x1):
+    n = len(data)
+    if n < 126:
+        head = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 65536:
+        head = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return head + data
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local multi-user quiz server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args(argv)
+    service = QuizService(open_history_store())
+    try:
+        asyncio.run(QuizServer(service, args.host, args.port).serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
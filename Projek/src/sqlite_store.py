@@ -0,0 +1,450 @@
+"""
+SQLite storage backend for the question bank and session history.
+
+Select it with the environment variable BLOOM_STORAGE=sqlite (see
+utils.STORAGE_BACKEND); the JSON files stay the default.
+
+Import the existing JSON data:
+  python sqlite_store.py import [--soal data/soal.json] [--history data/history.jsonl]
+"""
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import threading
+from collections import Counter
+
+from tracing import traced, span
+from history_store import HistoryStats
+from utils import (
+    BankIndex, SeenIndex, compile_items, load_json, log_report, _norm_pkg_name,
+    SOAL_FILE, HISTORY_FILE, HISTORY_LOG, DB_FILE, ensure_dirs
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS questions (
+    pos INTEGER PRIMARY KEY,
+    id TEXT,
+    package TEXT,
+    package_norm TEXT,
+    level TEXT,
+    level_norm TEXT,
+    topic TEXT,
+    topic_norm TEXT,
+    correct_answer INTEGER,
+    playable INTEGER NOT NULL DEFAULT 1,
+    question TEXT,
+    choices TEXT,
+    explanation TEXT,
+    reading TEXT
+);
+CREATE INDEX IF NOT EXISTS questions_plt ON questions (package_norm, level_norm, topic_norm);
+CREATE INDEX IF NOT EXISTS questions_id ON questions (id);
+CREATE TABLE IF NOT EXISTS history (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    sid TEXT,
+    user TEXT,
+    date TEXT,
+    package TEXT,
+    package_norm TEXT,
+    stats_key TEXT,
+    level TEXT,
+    daily INTEGER,
+    score INTEGER,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_package_date ON history (package_norm, date);
+CREATE INDEX IF NOT EXISTS history_user_date ON history (user, date);
+CREATE TABLE IF NOT EXISTS served (
+    seq INTEGER NOT NULL,
+    user TEXT,
+    package_norm TEXT,
+    qid TEXT
+);
+CREATE INDEX IF NOT EXISTS served_lookup ON served (user, package_norm, qid);
+CREATE TABLE IF NOT EXISTS review (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    record TEXT NOT NULL
+);
+"""
+
+TEXT_COLUMNS = ('question', 'choices', 'explanation', 'reading')
+
+class Database:
+    """One shared connection in WAL mode, serialized by a lock."""
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Add columns introduced after a database was created."""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(history)")}
+        if 'stats_key' not in columns:
+            def write(conn):
+                conn.execute("ALTER TABLE history ADD COLUMN stats_key TEXT")
+                conn.executemany("UPDATE history SET stats_key = ? WHERE seq = ?",
+                                 [(HistoryStats.package_key(package), seq) for seq, package
+                                  in conn.execute("SELECT seq, package FROM history").fetchall()])
+            self.write(write)
+
+    @classmethod
+    def get(cls, path=DB_FILE):
+        ensure_dirs()
+        path = os.path.abspath(path)
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def write(self, fn):
+        """Run fn(conn) inside one transaction."""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self.conn)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def bump_version(self, conn, key):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1", (key,))
+
+    def version(self, key):
+        rows = self.query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+# ================= QUESTIONS =================
+class SQLiteBank:
+    """
+    Question bank backed by the questions table, same interface as
+    utils.QuestionBank. Only metadata is held in memory; text is fetched
+    per question on first access. Reloads when the bank version changes.
+    """
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self._version = object()
+        self._state = ([], BankIndex([]), [])
+        self._lock = threading.Lock()
+
+    @property
+    def db(self):
+        return Database.get(self.path)
+
+    def _current(self):
+        version = self.db.version('bank_version')
+        if version == self._version:
+            return self._state
+        with self._lock:
+            if version != self._version:
+                self._state, self._version = self._load(), version
+                log_report(self._state[2])
+            return self._state
+
+    @traced("bank.load")
+    def _load(self):
+        from bankfile import LazyQuestion
+        rows = self.db.query(
+            "SELECT pos, id, package, topic, level, correct_answer, playable FROM questions ORDER BY pos")
+        questions = [LazyQuestion(self, pos, qid, pkg, topic, level, ans, 1 if playable else 0)
+                     for pos, qid, pkg, topic, level, ans, playable in rows]
+        report = json.loads(self.db.version('bank_report') or '[]')
+        return questions, BankIndex(questions), report
+
+    def text(self, pos):
+        rows = self.db.query("SELECT question, choices, explanation, reading FROM questions WHERE pos = ?", (pos,))
+        if not rows:
+            return {}
+        out = {}
+        for k, v in zip(TEXT_COLUMNS, rows[0]):
+            if v is not None:
+                out[k] = json.loads(v) if k in ('choices', 'explanation') else v
+        return out
+
+    def items(self):
+        return self._current()[0]
+
+    def index(self):
+        return self._current()[1]
+
+    def report(self):
+        return self._current()[2]
+
+    def version(self):
+        self._current()
+        return f"sqlite:{self._version}"
+
+    def invalidate(self):
+        with self._lock:
+            self._version = object()
+
+    def query(self, package=None, level=None, topic=None):
+        """Ids of questions matching the filters, answered from the (package, level, topic) index."""
+        where, params = [], []
+        for col, val in (('package_norm', package), ('level_norm', level), ('topic_norm', topic)):
+            if val:
+                where.append(f"{col} = ?")
+                params.append(_norm_pkg_name(val))
+        sql = "SELECT id FROM questions WHERE playable = 1 AND correct_answer IS NOT NULL"
+        if where:
+            sql += " AND " + " AND ".join(where)
+        return [r[0] for r in self.db.query(sql + " ORDER BY pos", params)]
+
+def import_questions(items, path=DB_FILE):
+    """Replace the questions table with the compiled `items`. Returns the count."""
+    questions, report = compile_items(items)
+    db = Database.get(path)
+
+    def write(conn):
+        conn.execute("DELETE FROM questions")
+        conn.executemany(
+            "INSERT INTO questions (pos, id, package, package_norm, level, level_norm, topic, topic_norm, "
+            "correct_answer, playable, question, choices, explanation, reading) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((pos, q.id, q.package, _norm_pkg_name(q.package), q.level, _norm_pkg_name(q.level),
+              q.topic, _norm_pkg_name(q.topic), q.correct_answer, 1 if q.playable else 0,
+              q.question, json.dumps(list(q.choices), ensure_ascii=False),
+              None if q.explanation is None else json.dumps(q.explanation, ensure_ascii=False),
+              q.reading)
+             for pos, q in enumerate(questions)))
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('bank_report', ?)",
+                     (json.dumps(report, ensure_ascii=False),))
+        db.bump_version(conn, 'bank_version')
+
+    db.write(write)
+    return len(questions)
+
+# ================= HISTORY =================
+class SQLiteSeenIndex(SeenIndex):
+    """SeenIndex answered by the served table instead of an in-memory set."""
+
+    def __init__(self, store, user=None):
+        super().__init__()
+        self.store = store
+        self.user = user
+
+    def add_record(self, rec):
+        # the store writes the served rows when the record is appended
+        pass
+
+    def seen(self, package):
+        return set(self.counts(package))
+
+    def counts(self, package):
+        rows = self.store.db.query(
+            "SELECT qid, COUNT(*) FROM served WHERE user IS ? AND package_norm = ? GROUP BY qid",
+            (self.user, _norm_pkg_name(package)))
+        return Counter(dict(rows))
+
+    def clear(self):
+        pass
+
+class SQLiteHistoryStore:
+    """History store with the HistoryStore interface plus indexed queries."""
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+
+    @property
+    def db(self):
+        return Database.get(self.path)
+
+    def open(self):
+        self.db
+        return self
+
+    def iter_records(self):
+        last = 0
+        while True:
+            rows = self.db.query("SELECT seq, record FROM history WHERE seq > ? ORDER BY seq LIMIT 1000", (last,))
+            if not rows:
+                return
+            for seq, rec in rows:
+                yield json.loads(rec)
+            last = rows[-1][0]
+
+    def load(self):
+        return list(self.iter_records())
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        if not records:
+            return
+        with span("history.append", backend="sqlite", records=len(records)):
+            self.db.write(lambda conn: self._insert(conn, records))
+
+    @staticmethod
+    def _insert(conn, records):
+        for rec in records:
+            pkg = _norm_pkg_name(rec.get('package'))
+            cur = conn.execute(
+                "INSERT INTO history (sid, user, date, package, package_norm, stats_key, level, daily, score, record) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (rec.get('id'), rec.get('user'), rec.get('date'), rec.get('package'), pkg,
+                 HistoryStats.package_key(rec.get('package')), rec.get('level'), 1 if rec.get('daily') else 0, rec.get('score'),
+                 json.dumps(rec, ensure_ascii=False)))
+            conn.executemany(
+                "INSERT INTO served (seq, user, package_norm, qid) VALUES (?, ?, ?, ?)",
+                ((cur.lastrowid, rec.get('user'), pkg, qid) for qid in rec.get('all_ids') or []))
+
+    def compact(self, records=None):
+        if records is None:
+            return
+        records = list(records)
+
+        def write(conn):
+            # one transaction: a failed insert keeps the old history
+            conn.execute("DELETE FROM history")
+            conn.execute("DELETE FROM served")
+            self._insert(conn, records)
+
+        self.db.write(write)
+
+    def clear(self):
+        self.db.write(lambda conn: (conn.execute("DELETE FROM history"), conn.execute("DELETE FROM served")))
+
+    def seen_index(self, user=None):
+        return SQLiteSeenIndex(self, user)
+
+    def count(self):
+        return self.db.query("SELECT COUNT(*) FROM history")[0][0]
+
+    def page(self, offset=0, limit=50):
+        return self.records(limit=limit, offset=offset)
+
+    def history_stats(self):
+        """HistoryStats seeded from SQL aggregates instead of a replay of every record."""
+        stats = HistoryStats()
+        recent = {}
+        for key, daily, score in self.db.query(
+                "SELECT stats_key, daily, score FROM ("
+                "  SELECT stats_key, daily, score, seq, "
+                "  ROW_NUMBER() OVER (PARTITION BY stats_key, daily ORDER BY seq DESC) AS n FROM history"
+                ") WHERE n <= ? ORDER BY seq", (2 * stats.TREND,)):
+            recent.setdefault((key, bool(daily)), []).append(float(score or 0))
+        rows = self.db.query(
+            "SELECT stats_key, daily, COUNT(*), SUM(score), MAX(score) FROM history GROUP BY stats_key, daily")
+        for key, daily, attempts, total, best in rows:
+            stats.set_aggregate(key, attempts, total, best, recent.get((key, bool(daily)), []), daily=bool(daily))
+        return stats
+
+    def records(self, package=None, user=None, since=None, limit=None, offset=0):
+        """Newest-first history records, filtered on the indexed columns."""
+        where, params = [], []
+        if package:
+            where.append("package_norm = ?")
+            params.append(_norm_pkg_name(package))
+        if user is not None:
+            where.append("user = ?")
+            params.append(user)
+        if since:
+            where.append("date >= ?")
+            params.append(since)
+        sql = "SELECT record FROM history"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY seq DESC"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        return [json.loads(r[0]) for r in self.db.query(sql, params)]
+
+class SQLiteReviewStore:
+    """Review schedule log (see review.py) in the same database as the history."""
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+
+    @property
+    def db(self):
+        return Database.get(self.path)
+
+    def open(self):
+        self.db
+        return self
+
+    def iter_records(self):
+        last = 0
+        while True:
+            rows = self.db.query("SELECT seq, record FROM review WHERE seq > ? ORDER BY seq LIMIT 1000", (last,))
+            if not rows:
+                return
+            for seq, rec in rows:
+                yield json.loads(rec)
+            last = rows[-1][0]
+
+    def load(self):
+        return list(self.iter_records())
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        if not records:
+            return
+        rows = [(json.dumps(rec, ensure_ascii=False),) for rec in records]
+        self.db.write(lambda conn: conn.executemany("INSERT INTO review (record) VALUES (?)", rows))
+
+    def compact(self, records=None):
+        if records is None:
+            return
+        rows = [(json.dumps(rec, ensure_ascii=False),) for rec in records]
+        self.db.write(lambda conn: (conn.execute("DELETE FROM review"),
+                                    conn.executemany("INSERT INTO review (record) VALUES (?)", rows)))
+
+    def clear(self):
+        self.compact([])
+
+def import_history(records, path=DB_FILE):
+    store = SQLiteHistoryStore(path)
+    store.compact(list(records))
+    return store
+
+# ================= CLI =================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Import the JSON data files into SQLite")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import")
+    imp.add_argument("--soal", default=SOAL_FILE)
+    imp.add_argument("--history", default=None, help="history.jsonl or history.json (default: current history)")
+    imp.add_argument("--db", default=DB_FILE)
+    args = ap.parse_args(argv)
+
+    items = load_json(args.soal, default=[])
+    n = import_questions(items if isinstance(items, list) else [], args.db)
+
+    from history_store import HistoryStore
+    hist = args.history
+    if hist and hist.endswith('.json'):
+        records = [r for r in load_json(hist, default=[]) if isinstance(r, dict)]
+    else:
+        records = HistoryStore(hist or HISTORY_LOG, HISTORY_FILE).open().load()
+    import_history(records, args.db)
+    print(f"{n} soal, {len(records)} riwayat -> {args.db}")
+
+if __name__ == "__main__":
+    sys.exit(main())
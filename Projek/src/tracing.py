@@ -0,0 +1,230 @@
+"""
+Lightweight spans and counters.
+
+    from tracing import span, count, event, traced
+
+    with span("bank.load", path=path):
+        ...
+    count("history.appended", len(records))
+    event("quiz.start", package=pkg, selected=8)
+
+    @traced("screen.history")
+    def _history(self): ...
+
+Tracing is off unless BLOOM_TRACE is set (BLOOM_TRACE=1 writes to
+data/trace.jsonl, any other value is used as the file path) or enable()
+is called (the diagnostics panel enables it in memory only). While off,
+span() returns a shared no-op object and traced() adds one flag check
+per call.
+
+While on, every span and event is kept in per-name aggregates (see
+snapshot(), used by the diagnostics panel) and, when a file is given,
+appended to a JSONL file that rotates at MAX_BYTES keeping BACKUPS old
+files (trace.jsonl.1, .2, ...).
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import functools
+import threading
+
+MAX_BYTES = 1 << 20
+BACKUPS = 3
+FLUSH_EVERY = 64
+
+_enabled = False
+_lock = threading.Lock()
+_sink = None
+_stats = {}
+_counters = {}
+
+class SpanStat:
+    __slots__ = ('count', 'total', 'max', 'last')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+def default_path():
+    # resolved lazily: utils imports this module
+    from utils import DATA_DIR
+    return os.path.join(DATA_DIR, 'trace.jsonl')
+
+class RotatingFile:
+    """
+    Buffered JSONL writer that rotates path -> path.1 -> ... at max_bytes.
+    path=None means default_path(), looked up at the first flush.
+    """
+
+    def __init__(self, path=None, max_bytes=MAX_BYTES, backups=BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffer = []
+
+    def write(self, record):
+        self.buffer.append(json.dumps(record, ensure_ascii=False, default=str))
+        if len(self.buffer) >= FLUSH_EVERY:
+            self.flush()
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def flush(self):
+        if not self.buffer:
+            return
+        data = "\n".join(self.buffer) + "\n"
+        self.buffer = []
+        try:
+            if self.path is None:
+                self.path = default_path()
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(data) > self.max_bytes:
+                self._rotate()
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(data)
+        except OSError as e:
+            print(f"tracing: cannot write {self.path}: {e}", file=sys.stderr)
+
+class Span:
+    __slots__ = ('name', 'attrs', 'start', 'wall')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        rec = {'ts': round(self.wall, 3), 'span': self.name, 'ms': round(seconds * 1000, 3)}
+        if self.attrs:
+            rec.update(self.attrs)
+        if exc_type is not None:
+            rec['error'] = exc_type.__name__
+        _emit(self.name, seconds, rec)
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def _emit(name, seconds, rec):
+    with _lock:
+        if seconds is not None:
+            st = _stats.get(name)
+            if st is None:
+                st = _stats[name] = SpanStat()
+            st.add(seconds)
+        if _sink is not None:
+            _sink.write(rec)
+
+# ================= API =================
+def enabled():
+    return _enabled
+
+def span(name, **attrs):
+    """Context manager timing a block; a shared no-op while tracing is off."""
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, attrs)
+
+def traced(name):
+    """Decorator form of span()."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(name, None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+def count(name, n=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def event(name, **attrs):
+    """A point-in-time record (no duration), e.g. what a session was started with."""
+    if not _enabled:
+        return
+    rec = {'ts': round(time.time(), 3), 'event': name}
+    rec.update(attrs)
+    count(name)
+    _emit(name, None, rec)
+
+def snapshot():
+    """{'spans': {name: {count, total_ms, mean_ms, max_ms, last_ms}}, 'counters': {...}}"""
+    with _lock:
+        spans = {
+            name: {'count': st.count, 'total_ms': st.total * 1000, 'mean_ms': st.total * 1000 / st.count,
+                   'max_ms': st.max * 1000, 'last_ms': st.last * 1000}
+            for name, st in _stats.items()
+        }
+        return {'spans': spans, 'counters': dict(_counters)}
+
+def flush():
+    with _lock:
+        if _sink is not None:
+            _sink.flush()
+
+def enable(path=None, export=True):
+    """
+    Start collecting. With export, records also go to a rotating JSONL
+    file (`path`, default data/trace.jsonl); without, only snapshot() sees them.
+    """
+    global _enabled, _sink
+    with _lock:
+        if export and (_sink is None or (path is not None and _sink.path != path)):
+            if _sink is not None:
+                _sink.flush()
+            _sink = RotatingFile(path)
+        _enabled = True
+
+def disable():
+    global _enabled, _sink
+    with _lock:
+        _enabled = False
+        if _sink is not None:
+            _sink.write({'ts': round(time.time(), 3), 'counters': dict(_counters)})
+            _sink.flush()
+            _sink = None
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _counters.clear()
+
+atexit.register(disable)
+
+_env = os.environ.get('BLOOM_TRACE', '').strip()
+if _env and _env != '0':
+    enable(None if _env == '1' else _env)
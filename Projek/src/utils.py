@@ -1,17 +1,33 @@
 import os
 import json
 import random
+import struct
+import hashlib
 import datetime
+import threading
+from collections import Counter
+
+from tracing import traced, event
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, '..', 'data') if os.path.basename(BASE_DIR).lower() == 'src' else os.path.join(BASE_DIR, 'data')
 SOAL_FILE = os.path.join(DATA_DIR, 'soal.json')
 HISTORY_FILE = os.path.join(DATA_DIR, 'history.json')
+HISTORY_LOG = os.path.join(DATA_DIR, 'history.jsonl')
+SOAL_BIN = os.path.join(DATA_DIR, 'soal.bin')
+DB_FILE = os.path.join(DATA_DIR, 'bloom.db')
+
+# 'json' (soal.json + history.jsonl) or 'sqlite' (DB_FILE, see sqlite_store.py)
+STORAGE_BACKEND = os.environ.get('BLOOM_STORAGE', 'json').strip().lower()
+
+_dirs_ready = False
 
 def ensure_dirs():
+    global _dirs_ready
+    if _dirs_ready:
+        return
     os.makedirs(DATA_DIR, exist_ok=True)
-    if not os.path.exists(HISTORY_FILE):
-        save_json(HISTORY_FILE, [])
+    _dirs_ready = True
 
 def load_json(path, default=None):
     if default is None:
@@ -32,75 +48,422 @@ def save_json(path, data):
 def _norm_pkg_name(name):
     return (str(name or "")).strip().lower()
 
+# ----------------- compiled questions -----------------
+def resolve_answer(ca, choices):
+    """
+    Resolve a raw correct_answer to a choice index, or None.
+    Accepts an int index, a letter ("A".."E"), the exact choice text or
+    the choice text ignoring case/surrounding spaces.
+    """
+    if isinstance(ca, bool):
+        return None
+    if isinstance(ca, int):
+        return ca if 0 <= ca < len(choices) else None
+    if not isinstance(ca, str):
+        return None
+    s = ca.strip()
+    if len(s) == 1 and s.isalpha():
+        idx = ord(s.upper()) - ord('A')
+        if 0 <= idx < len(choices):
+            return idx
+    for i, c in enumerate(choices):
+        if c == s:
+            return i
+    low = s.lower()
+    for i, c in enumerate(choices):
+        if str(c).strip().lower() == low:
+            return i
+    return None
+
+class Question:
+    """
+    Compiled, read-only question record shared by every session.
+    correct_answer is already an index into choices (or None when the raw
+    value could not be resolved). get()/[] mirror the dict interface so
+    code written against the raw JSON items keeps working.
+    """
+
+    FIELDS = ('id', 'package', 'topic', 'level', 'question', 'choices',
+              'correct_answer', 'explanation', 'reading')
+    __slots__ = FIELDS
+
+    def __init__(self, id=None, package=None, topic=None, level=None, question=None,
+                 choices=(), correct_answer=None, explanation=None, reading=None):
+        self.id = id
+        self.package = package
+        self.topic = topic
+        self.level = level
+        self.question = question
+        self.choices = choices
+        self.correct_answer = correct_answer
+        self.explanation = explanation
+        self.reading = reading
+
+    @classmethod
+    def compile(cls, it):
+        choices = tuple(str(c) for c in (it.get('choices') or []))
+        return cls(
+            id=it.get('id'),
+            package=it.get('package'),
+            topic=it.get('topic'),
+            level=it.get('level'),
+            question=it.get('question'),
+            choices=choices,
+            correct_answer=resolve_answer(it.get('correct_answer'), choices),
+            explanation=it.get('explanation'),
+            reading=it.get('reading'),
+        )
+
+    @property
+    def playable(self):
+        # an unresolved answer could never be graded correct, so it is never served
+        return bool(self.question or self.choices or self.reading) and self.correct_answer is not None
+
+    def get(self, key, default=None):
+        if key not in Question.FIELDS:
+            return default
+        v = getattr(self, key)
+        return default if v is None else v
+
+    def __getitem__(self, key):
+        if key not in Question.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in Question.FIELDS and getattr(self, key) is not None
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in Question.FIELDS if getattr(self, k) is not None}
+
+    def text_fields(self):
+        """question, choices, explanation and reading, for indexing."""
+        return {'question': self.question, 'choices': self.choices,
+                'explanation': self.explanation, 'reading': self.reading}
+
+    def __repr__(self):
+        return f"Question(id={self.id!r}, package={self.package!r}, level={self.level!r})"
+
+def compile_items(items):
+    """
+    Compile raw JSON items into Question records.
+    Returns (questions, report); report lists the problems found, one dict
+    per problem with id, package and problem.
+    """
+    questions = []
+    report = []
+    for pos, it in enumerate(items or []):
+        if not isinstance(it, dict):
+            report.append({'id': None, 'package': None, 'problem': f'item #{pos} is not an object'})
+            continue
+        q = Question.compile(it)
+        questions.append(q)
+        if not (q.question or q.choices or q.reading):
+            report.append({'id': q.id, 'package': q.package, 'problem': 'no question, choices or reading'})
+        elif not q.choices:
+            report.append({'id': q.id, 'package': q.package, 'problem': 'no choices'})
+        elif q.correct_answer is None:
+            report.append({'id': q.id, 'package': q.package,
+                           'problem': f'correct_answer {it.get("correct_answer")!r} does not match any choice'})
+    return questions, report
+
+# ----------------- question bank -----------------
+def _is_playable(it):
+    if isinstance(it, Question):
+        return it.playable
+    return Question.compile(it).playable
+
+def log_report(report):
+    """Trace one bank.invalid_question event per validation problem (see validation_report())."""
+    for problem in report:
+        event("bank.invalid_question", **problem)
+
+def file_stamp(path):
+    """(mtime_ns, size) of a file, or None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+class PackageIndex:
+    """Playable questions of one package, grouped by level and topic."""
+
+    def __init__(self, name=None):
+        self.name = name
+        self.items = []
+        self.by_level = {}
+        self.levels = {}
+
+    def add(self, it):
+        lvl = _norm_pkg_name(it.get('level'))
+        topic = _norm_pkg_name(it.get('topic'))
+        self.items.append(it)
+        self.by_level.setdefault(lvl, []).append(it)
+        self.levels.setdefault(lvl, {}).setdefault(topic, []).append(it)
+
+class BankIndex:
+    """
+    Lookup tables built once per bank load:
+    - packages: normalized package -> PackageIndex (level -> topic -> items)
+    - by_id: question id -> item
+    - names: normalized package names, used for fuzzy matching
+    - package_names: display names as returned by list_packages_from_soal
+    """
+
+    def __init__(self, items):
+        self.packages = {}
+        self.by_id = {}
+        self.all = PackageIndex()
+        display = set()
+        for it in items:
+            qid = it.get('id')
+            if qid is not None:
+                self.by_id.setdefault(qid, it)
+            raw = str(it.get('package', '')).strip()
+            if raw:
+                display.add(raw)
+            if not _is_playable(it):
+                continue
+            pkg = _norm_pkg_name(raw)
+            if pkg not in self.packages:
+                self.packages[pkg] = PackageIndex(pkg)
+            self.packages[pkg].add(it)
+            self.all.add(it)
+        self.names = sorted(self.packages)
+        self.package_names = sorted(display)
+
+    def match(self, pkg_name):
+        """Exact normalized match first, then substring match over the name table."""
+        if not pkg_name:
+            return [self.all]
+        target = _norm_pkg_name(pkg_name)
+        if target in self.packages:
+            return [self.packages[target]]
+        return [self.packages[n] for n in self.names if target in n]
+
+class QuestionBank:
+    """
+    Process-wide cache of a question file.
+    - The file is parsed and compiled to Question records once and kept in
+      memory, together with its BankIndex and validation report.
+    - When a compiled bank (see bankfile.py) built from the current JSON
+      exists, only its metadata columns are read; long text stays on disk.
+    - Every access compares the files' mtime/size with the cached values and
+      only re-parses when a file actually changed.
+    - The returned objects are shared; callers must not mutate them.
+    """
+
+    def __init__(self, path, compiled_path=None):
+        self.path = path
+        self.compiled_path = compiled_path
+        self._stamp = None
+        self._state = ([], BankIndex([]), [])
+        self._compiled = None
+        self._lock = threading.Lock()
+
+    def _file_stamp(self):
+        src = file_stamp(self.path)
+        binary = file_stamp(self.compiled_path) if self.compiled_path else None
+        if src is None and binary is None:
+            return None
+        return (src, binary)
+
+    @traced("bank.load")
+    def _load(self, stamp):
+        """(state, open CompiledBank or None) for the files at `stamp`."""
+        src, binary = stamp
+        if binary is not None:
+            import bankfile
+            try:
+                compiled, questions, report = bankfile.load_bank(self.compiled_path, expect_source=src)
+                return (questions, BankIndex(questions), report), compiled
+            except (OSError, ValueError, struct.error):
+                # stale or unreadable compiled bank: fall back to the JSON file
+                pass
+        data = load_json(self.path, default=[])
+        questions, report = compile_items(data if isinstance(data, list) else [])
+        return (questions, BankIndex(questions), report), None
+
+    def _replace(self, state, stamp, compiled=None):
+        # the previous mmap must go before soal.bin can be rebuilt (Windows)
+        if self._compiled is not None:
+            self._compiled.close()
+        self._state, self._stamp, self._compiled = state, stamp, compiled
+
+    def _current(self):
+        stamp = self._file_stamp()
+        if stamp is not None and stamp == self._stamp:
+            return self._state
+        with self._lock:
+            if stamp is None:
+                self._replace(([], BankIndex([]), []), None)
+            elif stamp != self._stamp:
+                state, compiled = self._load(stamp)
+                self._replace(state, stamp, compiled)
+                log_report(self._state[2])
+            return self._state
+
+    def items(self):
+        return self._current()[0]
+
+    def index(self):
+        return self._current()[1]
+
+    def report(self):
+        return self._current()[2]
+
+    def version(self):
+        """Opaque key that changes whenever the loaded questions change."""
+        self._current()
+        return f"json:{self._stamp}"
+
+    def invalidate(self):
+        with self._lock:
+            self._replace(([], BankIndex([]), []), None)
+
+def _open_bank():
+    if STORAGE_BACKEND == 'sqlite':
+        from sqlite_store import SQLiteBank
+        return SQLiteBank(DB_FILE)
+    return QuestionBank(SOAL_FILE, SOAL_BIN)
+
+# opened on first use: sqlite_store imports this module, so it cannot be
+# imported while utils itself is still loading
+_BANK = None
+_BANK_LOCK = threading.Lock()
+
+def get_bank():
+    global _BANK
+    if _BANK is None:
+        with _BANK_LOCK:
+            if _BANK is None:
+                _BANK = _open_bank()
+    return _BANK
+
+class QuestionPool(list):
+    """List of questions that also carries a level -> questions lookup."""
+
+    def __init__(self, items=(), by_level=None):
+        super().__init__(items)
+        self.by_level = by_level or {}
+
 # ----------------- data access -----------------
 def load_all_items():
     ensure_dirs()
-    return load_json(SOAL_FILE, default=[])
+    return get_bank().items()
+
+def load_index():
+    ensure_dirs()
+    return get_bank().index()
+
+def validation_report():
+    ensure_dirs()
+    return list(get_bank().report())
 
 def list_packages_from_soal():
-    items = load_all_items() or []
-    pkgs = set()
-    for it in items:
-        p = str(it.get('package', '')).strip()
-        if p:
-            pkgs.add(p)  
-    return sorted(pkgs)
+    return list(load_index().package_names)
+
+def list_topics(pkg_name=None):
+    """(topic, count) pairs of the playable questions of a package, by topic name."""
+    counts = Counter()
+    for pidx in load_index().match(pkg_name):
+        for topics in pidx.levels.values():
+            for topic, group in topics.items():
+                counts[topic] += len(group)
+    return sorted(counts.items())
 
 def load_questions_for_package(pkg_name):
     """
     Return list of questions for a package.
     - If pkg_name falsy, return all valid questions.
     - Matching is case-insensitive and ignores surrounding spaces.
+    - Falls back to substring matching on the package name table.
+    - The returned Question records are shared and must not be mutated.
     """
-    items = load_all_items() or []
-    if not pkg_name:
-        return [it.copy() for it in items if it.get('question') or it.get('choices') or it.get('reading')]
+    matches = load_index().match(pkg_name)
+    if len(matches) == 1:
+        return QuestionPool(matches[0].items, matches[0].by_level)
+    pool = QuestionPool()
+    for pidx in matches:
+        pool.extend(pidx.items)
+        for lvl, group in pidx.by_level.items():
+            pool.by_level.setdefault(lvl, []).extend(group)
+    return pool
 
-    target = _norm_pkg_name(pkg_name)
-    questions = []
-    for it in items:
-        p = _norm_pkg_name(it.get('package', ''))
-        if p == target and (it.get('question') or it.get('choices') or it.get('reading')):
-            questions.append(it.copy())
-
-    if not questions:
-        for it in items:
-            p = _norm_pkg_name(it.get('package', ''))
-            if target in p and (it.get('question') or it.get('choices') or it.get('reading')):
-                questions.append(it.copy())
-
-    return questions or []
+def search_questions(query, package=None, limit=20):
+    """
+    Ranked full-text search over question, choices, explanation and reading.
+    Returns up to `limit` shared Question records, best match first.
+    The index is built once per bank version and cached on disk (search_index.py).
+    """
+    import search_index
+    return search_index.get_search_index().search(query, package=package, limit=limit)
 
 # ----------------- normalization -----------------
+@traced("normalize")
 def normalize_correct_answer(db):
+    """
+    Resolve string answers to choice indexes in raw dict items.
+    Compiled Question records are already resolved and are left untouched.
+    """
     if not db:
         return []
     for q in db:
+        if isinstance(q, Question):
+            continue
         ca = q.get('correct_answer')
-        choices = q.get('choices') or []
         if isinstance(ca, int):
             continue
-        if isinstance(ca, str):
-            s = ca.strip()
-            if len(s) == 1 and s.isalpha():
-                idx = ord(s.upper()) - ord('A')
-                if 0 <= idx < len(choices):
-                    q['correct_answer'] = idx
-                    continue
-            try:
-                q['correct_answer'] = choices.index(s)
-                continue
-            except Exception:
-                lowered = [str(c).strip().lower() for c in choices]
-                try:
-                    q['correct_answer'] = lowered.index(s.lower())
-                    continue
-                except Exception:
-                    pass
+        idx = resolve_answer(ca, q.get('choices') or [])
+        if idx is not None:
+            q['correct_answer'] = idx
     return db
 
 # ----------------- history helpers -----------------
+class SeenIndex:
+    """
+    Per-package record of served question ids, kept up to date as sessions
+    finish so selection never rescans the history.
+    - seen(package): set of ids served at least once
+    - counts(package): Counter of how many times each id was served
+    """
+
+    def __init__(self):
+        self._seen = {}
+        self._counts = {}
+
+    @classmethod
+    def from_history(cls, history):
+        idx = cls()
+        for rec in history or []:
+            idx.add_record(rec)
+        return idx
+
+    def add_record(self, rec):
+        ids = rec.get('all_ids') or []
+        if not ids:
+            return
+        pkg = _norm_pkg_name(rec.get('package', ''))
+        seen = self._seen.setdefault(pkg, set())
+        counts = self._counts.setdefault(pkg, Counter())
+        for qid in ids:
+            seen.add(qid)
+            counts[qid] += 1
+
+    def seen(self, package):
+        return self._seen.get(_norm_pkg_name(package), set())
+
+    def counts(self, package):
+        return self._counts.get(_norm_pkg_name(package), Counter())
+
+    def clear(self):
+        self._seen.clear()
+        self._counts.clear()
+
 def used_ids_for_package(history, package):
+    if isinstance(history, SeenIndex):
+        return history.seen(package)
     target = _norm_pkg_name(package)
     used = set()
     for s in history or []:
@@ -110,31 +473,268 @@ def used_ids_for_package(history, package):
     return used
 
 # ----------------- selection -----------------
-def pick_questions_with_fresh_priority(db, n, history, package, level='all'):
+def _level_pool_from(items, by_level, level):
+    if level == 'all':
+        return list(items)
+    return by_level.get(level, []) + by_level.get('', [])
+
+def level_pool(db, level='all'):
+    """Questions of `db` matching `level`; questions without a level match every level."""
     level = (level or 'all').strip().lower()
-    pool = [q for q in (db or []) if (level == 'all' or not q.get('level') or _norm_pkg_name(q.get('level')) == level)]
+    by_level = getattr(db, 'by_level', None)
+    if by_level is not None:
+        return _level_pool_from(db, by_level, level)
+    return [q for q in (db or []) if (level == 'all' or not q.get('level') or _norm_pkg_name(q.get('level')) == level)]
+
+@traced("select.fresh_priority")
+def pick_questions_with_fresh_priority(db, n, history, package, level='all'):
+    """
+    Pick n questions, unseen ones first.
+    `history` is either a SeenIndex (preferred, O(pool)) or a list of history
+    records. With a SeenIndex the top-up from already seen questions takes
+    the least-served ones first.
+    """
+    pool = level_pool(db, level)
     used = used_ids_for_package(history or [], package)
-    fresh = [q for q in pool if q.get('id') not in used]
+    fresh = []
+    remaining = []
+    for q in pool:
+        (remaining if q.get('id') in used else fresh).append(q)
     rng = random.SystemRandom()
     if len(fresh) >= n:
         selected = rng.sample(fresh, k=n)
     else:
-        selected = list(fresh)
-        remaining = [q for q in pool if q.get('id') not in {x.get('id') for x in selected}]
-        if remaining:
-            selected.extend(rng.sample(remaining, k=min(n - len(selected), len(remaining))))
+        selected = fresh
+        need = n - len(selected)
+        if remaining and isinstance(history, SeenIndex):
+            counts = history.counts(package)
+            buckets = {}
+            for q in remaining:
+                buckets.setdefault(counts.get(q.get('id'), 0), []).append(q)
+            for c in sorted(buckets):
+                if need <= 0:
+                    break
+                group = buckets[c]
+                take = rng.sample(group, k=min(need, len(group)))
+                selected.extend(take)
+                need -= len(take)
+        elif remaining:
+            selected.extend(rng.sample(remaining, k=min(need, len(remaining))))
     rng.shuffle(selected)
     return selected
 
-def pick_daily_challenge_by_level(db, package, level='all', count=1):
+@traced("select.adaptive")
+def pick_questions_adaptive(n, history, package, level, ratings, target=1500.0):
+    """
+    Pick n questions whose difficulty is closest to `target`, unseen first.
+    `ratings` provides nearest(package, level, target) yielding questions in
+    order of rating distance (see analytics.Analytics); only the neighbourhood
+    of the target is visited, never the whole bank.
+    """
+    used = used_ids_for_package(history or [], package)
+    fresh, stale = [], []
+    window = 4 * n
+    for q in ratings.nearest(package, level, target):
+        (stale if q.get('id') in used else fresh).append(q)
+        if len(fresh) >= n or len(fresh) + len(stale) >= window:
+            break
+    selected = fresh[:n]
+    selected.extend(stale[:n - len(selected)])
+    random.SystemRandom().shuffle(selected)
+    return selected
+
+# ----------------- session builder -----------------
+class ConstraintError(ValueError):
+    """A session spec cannot be satisfied by the bank; `problems` lists each unmet part."""
+
+    def __init__(self, message, problems=()):
+        super().__init__(message)
+        self.problems = list(problems)
+
+def _describe(spec):
+    parts = [f"{k} {spec[k]}" for k in ('package', 'level', 'topic') if spec.get(k)]
+    return ", ".join(parts) or "semua soal"
+
+def _stratum_pool(index, package, level, topic):
+    """Questions matching package/level/topic (falsy = any), read from the BankIndex tables."""
+    lvl = _norm_pkg_name(level) if level else None
+    tp = _norm_pkg_name(topic) if topic else None
+    out = []
+    for pidx in index.match(package):
+        if lvl is None and tp is None:
+            out.extend(pidx.items)
+            continue
+        # like level_pool: questions without a level match every level
+        levels = list(pidx.levels) if lvl is None else list(dict.fromkeys((lvl, '')))
+        for l in levels:
+            topics = pidx.levels.get(l, {})
+            if tp is None:
+                for group in topics.values():
+                    out.extend(group)
+            else:
+                out.extend(topics.get(tp, ()))
+    return out
+
+def _allocate(total, specs):
+    """Question count per spec: explicit `count`, else `share` of total by largest remainder."""
+    counts = []
+    fractions = []
+    for i, spec in enumerate(specs):
+        if spec.get('count') is not None:
+            try:
+                c = int(spec['count'])
+            except (TypeError, ValueError, OverflowError):
+                raise ConstraintError(f"count harus berupa angka untuk {_describe(spec)}") from None
+            if c < 0:
+                raise ConstraintError(f"Jumlah soal negatif untuk {_describe(spec)}")
+            counts.append(c)
+            continue
+        try:
+            share = float(spec.get('share', 0))
+        except (TypeError, ValueError):
+            raise ConstraintError(f"share harus berupa angka untuk {_describe(spec)}") from None
+        if not 0 < share <= 1:
+            raise ConstraintError(f"share harus di antara 0 dan 1 untuk {_describe(spec)}")
+        exact = share * total
+        counts.append(int(exact))
+        fractions.append((exact - int(exact), i))
+    wanted = sum(counts) + round(sum(f for f, _ in fractions))
+    for _, i in sorted(fractions, reverse=True)[:max(0, wanted - sum(counts))]:
+        counts[i] += 1
+    if sum(counts) > total:
+        raise ConstraintError(f"Batasan meminta {sum(counts)} soal, sesi hanya {total} soal")
+    return counts
+
+@traced("select.session_builder")
+def build_session(total, constraints=(), package=None, history=None, rng=None):
+    """
+    Pick `total` questions that satisfy weighted constraints, e.g.
+        build_session(8, [{"topic": "matematika", "level": "hard", "share": 0.5}], package="pk")
+    Each constraint filters on package/level/topic and asks for a `count` or
+    a `share` of the session; whatever is left is filled from `package`
+    (or the whole bank). Strata are read straight from the BankIndex
+    package -> level -> topic tables and sampled most-constrained first,
+    unseen questions before seen ones (history: SeenIndex or records).
+    Pass a seeded random.Random as `rng` for a reproducible pick.
+    Raises ConstraintError listing every unmet constraint before sampling.
+    """
+    index = load_index()
+    specs = [dict(c) for c in constraints or ()]
+    for spec in specs:
+        spec.setdefault('package', package)
+    counts = _allocate(total, specs)
+    strata = [(_stratum_pool(index, s.get('package'), s.get('level'), s.get('topic')), c, s)
+              for s, c in zip(specs, counts) if c]
+    rest_spec = {'package': package}
+    strata.sort(key=lambda st: len(st[0]))
+    strata.append((_stratum_pool(index, package, None, None), total - sum(counts), rest_spec))
+
+    problems = [f"Hanya {len(pool)} soal untuk {_describe(spec)}, butuh {c}"
+                for pool, c, spec in strata if len(pool) < c]
+    if len(strata[-1][0]) < total:
+        problems.append(f"Hanya {len(strata[-1][0])} soal untuk {_describe(rest_spec)}, butuh {total}")
+    if problems:
+        raise ConstraintError("; ".join(dict.fromkeys(problems)), problems)
+
+    used = used_ids_for_package(history or [], package or '')
+    rng = rng or random.SystemRandom()
+    taken = set()
+    selected = []
+    for pool, c, spec in strata:
+        if not c:
+            continue
+        fresh, seen = [], []
+        for q in pool:
+            if id(q) not in taken:
+                (seen if q.get('id') in used else fresh).append(q)
+        part = rng.sample(fresh, k=min(c, len(fresh)))
+        if len(part) < c:
+            part.extend(rng.sample(seen, k=min(c - len(part), len(seen))))
+        if len(part) < c:
+            # overlapping strata used up the questions this one needed
+            msg = f"Hanya {len(part)} soal tersisa untuk {_describe(spec)}, butuh {c}"
+            raise ConstraintError(msg, [msg])
+        taken.update(id(q) for q in part)
+        selected.extend(part)
+    rng.shuffle(selected)
+    return selected
+
+def _stable_seed(*parts):
+    """RNG seed that is identical across processes (unlike hash() on str)."""
+    key = "::".join(str(p) for p in parts).encode('utf-8')
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], 'big')
+
+def _today():
+    return datetime.date.today().isoformat()
+
+def pick_daily_challenge_by_level(db, package, level='all', count=1, date=None):
     level = (level or 'all').strip().lower()
-    pool = [q for q in (db or []) if (level == 'all' or not q.get('level') or _norm_pkg_name(q.get('level')) == level)]
+    pool = level_pool(db, level)
     if not pool:
         return []
-    today = datetime.date.today().isoformat()
-    seed_str = f"{today}::{package}::{level}"
-    seed = abs(hash(seed_str)) % (2**32)
-    rng = random.Random(seed)
+    rng = random.Random(_stable_seed(date or _today(), _norm_pkg_name(package), level))
     selected = rng.sample(pool, k=min(count, len(pool)))
     rng.shuffle(selected)
-    return selected
\ No newline at end of file
+    return selected
+
+# ----------------- daily sets -----------------
+@traced("select.daily")
+def build_daily_set(db, package, mix, total, date=None):
+    """
+    Deterministic daily set for one package in a single stratified pass.
+    - mix: level -> count, taken in order (e.g. {"hard": 1, "medium": 2, "easy": 2})
+    - levels that run short are topped up from the rest of the pool
+    - the same date/package/mix always gives the same questions, in any process
+    """
+    date = date or _today()
+    rng = random.Random(_stable_seed(date, _norm_pkg_name(package)))
+    taken = set()
+    selected = []
+    for lvl, cnt in mix.items():
+        if cnt <= 0 or len(selected) >= total:
+            continue
+        cands = [q for q in level_pool(db, lvl) if id(q) not in taken]
+        part = rng.sample(cands, k=min(cnt, total - len(selected), len(cands)))
+        taken.update(id(q) for q in part)
+        selected.extend(part)
+    if len(selected) < total:
+        rest = [q for q in (db or []) if id(q) not in taken]
+        selected.extend(rng.sample(rest, k=min(total - len(selected), len(rest))))
+    return selected
+
+class DailySets:
+    """
+    Cache of the day's daily sets, keyed by date and package.
+    Entries are dropped when the bank reloads or the date changes, so a
+    lookup is a dict hit for the rest of the day after precompute().
+    """
+
+    def __init__(self, mix=None, total=5):
+        self.mix = dict(mix or {"hard": 1, "medium": 2, "easy": 2})
+        self.total = total
+        self._index = None
+        self._sets = {}
+        self._lock = threading.Lock()
+
+    def get(self, package, date=None):
+        date = date or _today()
+        pkg = _norm_pkg_name(package)
+        with self._lock:
+            index = load_index()
+            if index is not self._index:
+                self._index = index
+                self._sets = {}
+            day = self._sets.get(date)
+            if day is None:
+                # keep only the requested day plus the most recent other one
+                for old in sorted(self._sets)[:-1]:
+                    del self._sets[old]
+                day = self._sets[date] = {}
+            if pkg not in day:
+                db = load_questions_for_package(package)
+                day[pkg] = tuple(build_daily_set(db, package, self.mix, self.total, date))
+            return list(day[pkg])
+
+    def precompute(self, packages=None, date=None):
+        for p in (packages if packages is not None else list_packages_from_soal()):
+            self.get(p, date)
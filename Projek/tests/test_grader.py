@@ -0,0 +1,89 @@
+import os
+import sys
+import random
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import grader
+from grader import AnswerKey, Grader, parse_choice, iter_answers, BLANK, INVALID
+from utils import Question
+
+
+def bank():
+    return [Question.compile({"id": f"q{i}", "package": "pk", "level": ("easy", "medium", "hard")[i % 3],
+                              "question": "?", "choices": ["-1", "13", "19", "21"], "correct_answer": i % 4})
+            for i in range(12)]
+
+
+def answers(seed=7, n=3000):
+    rng = random.Random(seed)
+    raw = ["A", "B", "C", "D", "0", "3", "19", "-", "", "Z", "7", None]
+    return [(f"s{rng.randrange(40)}", f"q{rng.randrange(13)}", rng.choice(raw)) for _ in range(n)]
+
+
+def totals(np_module, daily, chunk):
+    saved = grader.np, grader.CHUNK
+    grader.np, grader.CHUNK = np_module, chunk
+    try:
+        g = Grader(AnswerKey(bank(), daily=daily)).grade(answers())
+        return (sorted(g.student_rows()), list(g.question_rows()), g.unknown, g.invalid)
+    finally:
+        grader.np, grader.CHUNK = saved
+
+
+class ParseChoiceTest(unittest.TestCase):
+    def test_rules(self):
+        q = bank()[0]
+        self.assertEqual(parse_choice("b", q), 1)
+        self.assertEqual(parse_choice("19", q), 2)  # a choice text, not index 19
+        self.assertEqual(parse_choice("3", q), 3)
+        self.assertEqual(parse_choice(" - ", q), BLANK)
+        self.assertEqual(parse_choice(None, q), BLANK)
+        self.assertEqual(parse_choice("7", q), INVALID)
+        self.assertEqual(parse_choice("Z", q), INVALID)
+
+
+class GraderTest(unittest.TestCase):
+    def test_python_totals(self):
+        rows, questions, unknown, invalid = totals(None, False, 1 << 16)
+        expected = {}
+        key = {q.id: q for q in bank()}
+        for student, qid, raw in answers():
+            if qid not in key:
+                continue
+            c = parse_choice(raw, key[qid])
+            st = expected.setdefault(student, [0, 0, 0])
+            st[0] += 1
+            st[1] += c >= 0
+            st[2] += c == key[qid].correct_answer
+        self.assertEqual({r[0]: list(r[1:4]) for r in rows}, expected)
+        self.assertEqual(unknown, sum(1 for _, qid, _ in answers() if qid not in key))
+        self.assertTrue(invalid)
+
+    def test_chunk_size_does_not_change_totals(self):
+        for daily in (False, True):
+            self.assertEqual(totals(None, daily, 1 << 16), totals(None, daily, 7))
+
+    @unittest.skipIf(grader.np is None, "NumPy not installed")
+    def test_numpy_matches_python(self):
+        for daily in (False, True):
+            for chunk in (1 << 16, 7):
+                self.assertEqual(totals(grader.np, daily, chunk), totals(None, daily, chunk))
+
+    def test_sheet_rows_need_a_student(self):
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("student,paper,answers\n,1,AB\nbudi,1,A-\nani,2,AB\n")
+        try:
+            report = {}
+            rows = list(iter_answers([path], {"1": ["q0", "q1"]}, report))
+        finally:
+            os.remove(path)
+        self.assertEqual(rows, [("budi", "q0", "A"), ("budi", "q1", "-")])
+        self.assertEqual(report, {"bad_rows": 1, "unknown_paper": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
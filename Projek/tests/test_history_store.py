@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from history_store import HistoryStore
+
+
+class HistoryStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "history.jsonl")
+        self.legacy = os.path.join(self.dir, "history.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def store(self):
+        return HistoryStore(self.path, self.legacy).open()
+
+    def test_torn_last_line_is_cut_off(self):
+        with open(self.path, "wb") as f:
+            f.write(b'{"id": 1}\n{"id": 2}\n{"id": 3, "sco')
+        self.assertEqual(self.store().load(), [{"id": 1}, {"id": 2}])
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b'{"id": 1}\n{"id": 2}\n')
+
+    def test_torn_only_line_empties_the_log(self):
+        with open(self.path, "wb") as f:
+            f.write(b'{"id": 1')
+        store = self.store()
+        self.assertEqual(store.load(), [])
+        store.append({"id": 2})
+        self.assertEqual(store.load(), [{"id": 2}])
+
+    def test_legacy_history_migrates_once(self):
+        with open(self.legacy, "w", encoding="utf-8") as f:
+            json.dump([{"id": 1}, "junk", {"id": 2}], f)
+        self.assertEqual(self.store().load(), [{"id": 1}, {"id": 2}])
+        with open(self.legacy, "w", encoding="utf-8") as f:
+            json.dump([{"id": 99}], f)
+        store = self.store()
+        store.append({"id": 3})
+        self.assertEqual(self.store().load(), [{"id": 1}, {"id": 2}, {"id": 3}])
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_page_offsets_after_append_many(self):
+        store = self.store()
+        store.append_many([{"id": i} for i in range(5)])
+        self.assertEqual(store.count(), 5)  # offsets are now cached
+        store.append_many([{"id": i, "text": "é" * i} for i in range(5, 9)])
+        store.append({"id": 9})
+        self.assertEqual(store.count(), 10)
+        self.assertEqual([r["id"] for r in store.page(0, 3)], [9, 8, 7])
+        self.assertEqual([r["id"] for r in store.page(3, 4)], [6, 5, 4, 3])
+        self.assertEqual([r["id"] for r in store.page(8, 5)], [1, 0])
+        self.assertEqual(store.page(10, 5), [])
+
+    def test_compact_keeps_given_records(self):
+        store = self.store()
+        store.append_many([{"id": i} for i in range(4)])
+        store.count()
+        store.compact([{"id": 1}, {"id": 3}])
+        self.assertEqual([r["id"] for r in store.page(0, 10)], [3, 1])
+        self.assertEqual(self.store().load(), [{"id": 1}, {"id": 3}])
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import io
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import import_bank
+from import_bank import iter_json_array, iter_csv, import_files
+
+
+def parse(text, chunk=None):
+    saved = import_bank.CHUNK
+    if chunk:
+        import_bank.CHUNK = chunk
+    try:
+        return list(iter_json_array(io.StringIO(text)))
+    finally:
+        import_bank.CHUNK = saved
+
+
+class JsonArrayTest(unittest.TestCase):
+    def test_elements(self):
+        self.assertEqual(parse('[{"a": 1}, [2], "x", 3.5, true, null]'),
+                         [{"a": 1}, [2], "x", 3.5, True, None])
+
+    def test_empty(self):
+        self.assertEqual(parse("[]"), [])
+        self.assertEqual(parse(" [ \n ] "), [])
+        self.assertEqual(parse(""), [])
+
+    def test_same_result_for_every_chunk_size(self):
+        items = [{"id": f"q{i}", "question": "x" * (i * 7 % 40), "n": 12345678901234567890 + i}
+                 for i in range(50)]
+        text = json.dumps(items, indent=1)
+        for chunk in (1, 2, 7, 64, 1 << 16):
+            self.assertEqual(parse(text, chunk), items, chunk)
+
+    def test_number_across_chunk_boundary(self):
+        self.assertEqual(parse("[12345678901234567890]", chunk=7), [12345678901234567890])
+        self.assertEqual(parse("[1, 23456, 7]", chunk=3), [1, 23456, 7])
+
+    def test_rejects_bad_separators(self):
+        for text in ("[1,,2]", "[,1]", "[1,]", "[1 2]", "[1", "[1,", "{}"):
+            with self.assertRaises(ValueError, msg=text):
+                parse(text)
+
+
+class CsvTest(unittest.TestCase):
+    def rows(self, text):
+        return list(iter_csv(io.StringIO(text)))
+
+    def test_choices_column(self):
+        item, = self.rows("id,package,question,choices,correct_answer\n"
+                          "q1,pk,Berapa?,1 | 2 | 3,B\n")
+        self.assertEqual(item["choices"], ["1", "2", "3"])
+        self.assertEqual(item["correct_answer"], "B")
+        self.assertIsNone(item["topic"])
+
+    def test_choice_columns(self):
+        item, = self.rows("ID,Package,Question,choice_a,choice_b,choice_c,correct_answer\n"
+                          "q1,pk,Apa?,merah,biru,,1\n")
+        self.assertEqual(item["choices"], ["merah", "biru"])
+        self.assertEqual(item["correct_answer"], 1)
+
+    def test_digit_answer_that_is_a_choice_stays_text(self):
+        item, = self.rows("id,package,question,choices,correct_answer\n"
+                          "q1,pk,Hasil?,-1|13|19|21|23,19\n")
+        self.assertEqual(item["correct_answer"], "19")
+
+
+class ImportFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.out = os.path.join(self.dir, "soal.json")
+        with open(self.out, "w", encoding="utf-8") as f:
+            f.write('[{"id": "old"}]')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def write(self, name, text):
+        path = os.path.join(self.dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_writes_valid_items(self):
+        src = self.write("in.jsonl", json.dumps({"id": "a", "package": "pk", "question": "?",
+                                                 "choices": ["x", "y"], "correct_answer": "y"}) + "\n")
+        report = import_files([src], self.out)
+        self.assertTrue(report.committed)
+        with open(self.out, encoding="utf-8") as f:
+            self.assertEqual([it["id"] for it in json.load(f)], ["a"])
+
+    def test_unreadable_input_leaves_output_alone(self):
+        good = self.write("in.jsonl", json.dumps({"id": "a", "package": "pk", "question": "?",
+                                                  "choices": ["x", "y"], "correct_answer": 0}) + "\n")
+        bad = self.write("bad.json", "[1,,2]")
+        for paths in ([os.path.join(self.dir, "missing.json")], [good, bad]):
+            report = import_files(paths, self.out)
+            self.assertFalse(report.committed)
+            self.assertEqual(report.counts["unreadable_file"], 1)
+            with open(self.out, encoding="utf-8") as f:
+                self.assertEqual(f.read(), '[{"id": "old"}]')
+            self.assertFalse(os.path.exists(self.out + ".tmp"))
+
+    def test_main_exit_status(self):
+        self.assertEqual(import_bank.main([os.path.join(self.dir, "missing.json"), "-o", self.out]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
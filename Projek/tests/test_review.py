@@ -0,0 +1,84 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from engine import MemoryStore, QuizEngine
+from review import ReviewScheduler, DAY
+
+T0 = 1_000_000.0
+
+
+def session(outcomes, user="u", package="pk"):
+    return {"user": user, "package": package,
+            "outcomes": [{"id": qid, "correct": ok} for qid, ok in outcomes]}
+
+
+class DueTest(unittest.TestCase):
+    def setUp(self):
+        self.store = MemoryStore()
+        self.r = ReviewScheduler(self.store)
+
+    def ids(self, **kw):
+        return [it.qid for it in self.r.due("u", **kw)]
+
+    def test_only_wrong_answers_are_scheduled(self):
+        self.r.add_record(session([("x1", True), ("x2", False)]), now=T0)
+        self.assertEqual(self.ids(now=T0 + 2 * DAY), ["x2"])
+
+    def test_earliest_due_first(self):
+        for i, qid in enumerate(("x3", "x1", "x2")):
+            self.r.add_record(session([(qid, False)]), now=T0 + i)
+        self.assertEqual(self.ids(now=T0 + 2 * DAY), ["x3", "x1", "x2"])
+        self.assertEqual(self.ids(now=T0 + 2 * DAY, k=2), ["x3", "x1"])
+        self.assertEqual(self.ids(now=T0), [])
+
+    def test_correct_answer_pushes_an_item_back(self):
+        self.r.add_record(session([("x1", False), ("x2", False)]), now=T0)
+        self.r.add_record(session([("x1", True)]), now=T0 + 1)
+        # x1 is now due one day after T0 + 1, x2 one day after T0
+        self.assertEqual(self.ids(now=T0 + DAY), ["x2"])
+        self.assertEqual(self.ids(now=T0 + DAY + 1), ["x2", "x1"])
+        # SM-2: the second correct answer in a row waits six days
+        self.r.add_record(session([("x1", True)]), now=T0 + DAY + 1)
+        self.assertEqual(self.ids(now=T0 + 7 * DAY), ["x2"])
+        self.assertEqual(self.ids(now=T0 + 7 * DAY + 1), ["x2", "x1"])
+
+    def test_users_and_packages_are_separate(self):
+        self.r.add_record(session([("x1", False)]), now=T0)
+        self.r.add_record(session([("y1", False)], user="v", package="lain"), now=T0)
+        self.assertEqual(self.ids(now=T0 + DAY, package="pk"), ["x1"])
+        self.assertEqual(self.ids(now=T0 + DAY, package="lain"), [])
+        self.assertEqual([it.qid for it in self.r.due("v", "lain", now=T0 + DAY)], ["y1"])
+
+    def test_schedule_survives_reload_and_compaction(self):
+        for i in range(300):
+            self.r.add_record(session([("x1", i % 2 == 0), ("x2", False)]), now=T0 + i)
+        self.r.add_record(session([("x3", False)]), now=T0 + 300)
+        before = [(it.qid, it.due) for it in self.r.due("u", now=T0 + 400 * DAY)]
+        entries = sum(len(h) for heaps in self.r.heaps.values() for h in heaps.values())
+        self.assertLessEqual(entries, 4 * 256)
+        self.assertLessEqual(len(self.store.records), 4 * 256 + 1)
+        again = ReviewScheduler(self.store)
+        self.assertFalse(again.fresh)
+        self.assertEqual([(it.qid, it.due) for it in again.due("u", now=T0 + 400 * DAY)], before)
+
+
+class BootstrapTest(unittest.TestCase):
+    def test_history_is_replayed_once(self):
+        history = MemoryStore([session([("x1", True)])])
+        log = MemoryStore()
+        QuizEngine(history, review=ReviewScheduler(log))
+        self.assertTrue(log.records)
+        self.assertFalse(ReviewScheduler(log).fresh)
+
+    def test_wrong_answers_in_history_are_scheduled(self):
+        history = MemoryStore([dict(session([("x1", False)]), date="2020-01-01 08:00")])
+        log = MemoryStore()
+        QuizEngine(history, review=ReviewScheduler(log))
+        self.assertEqual([it.qid for it in ReviewScheduler(log).due("u")], ["x1"])
+
+
+if __name__ == "__main__":
+    unittest.main()